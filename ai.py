@@ -0,0 +1,36 @@
+from typing import Optional
+
+from belief import BeliefTracker
+from engine import PASS, Game, GameState
+from cards import cards_to_mask
+from rules import get_rules
+
+_worker_policy = None
+
+def create_ai_policy(mode: str, think_time: float, workers: int, endgame_threshold: int = 0):
+    policy = None
+    if mode == "ismcts":
+        from ismcts import ISMCTSPolicy
+        policy = ISMCTSPolicy(time_limit=think_time, workers=workers)
+    if endgame_threshold > 0:
+        from endgame import EndgamePolicy
+        policy = EndgamePolicy(fallback=policy, threshold=endgame_threshold)
+    return policy
+
+def init_worker(mode: str, think_time: float, endgame_threshold: int = 0):
+    global _worker_policy
+    _worker_policy = create_ai_policy(mode, think_time, 1, endgame_threshold)
+
+def think(state: GameState, rules_name: str, tracker: Optional[BeliefTracker] = None) -> int:
+    game = Game(rules=get_rules(rules_name))
+    for player in game.players:
+        player.is_human = False
+    game.game_started = True
+    game.restore(state)
+    game.tracker = tracker
+    player = game.players[game.current_player]
+    if _worker_policy is None:
+        moves = game.valid_masks(player)
+        return moves[0] if moves else PASS
+    move = _worker_policy(game, player)
+    return cards_to_mask(move) if move else PASS
@@ -0,0 +1,236 @@
+import argparse
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from cards import NUM_CARDS, sort_value
+from engine import DEAL_ORDER
+from simulate import MAX_TURNS, SimulationStats, game_rng, play_game
+
+NO_HAND = 0
+SINGLE = 1
+PAIR = 2
+TRIPLE = 3
+QUAD = 4
+STRAIGHT = 5
+
+CARD_INDICES = np.arange(NUM_CARDS)
+VALUE_INDICES = np.arange(13)
+SUIT_INDICES = np.arange(4)
+SORT_VALUES = np.array([sort_value(index) for index in range(NUM_CARDS)], dtype=np.int32)
+DEAL_INDICES = np.array([card.index for card in DEAL_ORDER], dtype=np.int8)
+
+def deal_permutations(seed: int, start: int, count: int) -> np.ndarray:
+    perms = np.empty((count, NUM_CARDS), dtype=np.int8)
+    for row in range(count):
+        order = list(range(NUM_CARDS))
+        game_rng(seed, start + row).shuffle(order)
+        perms[row] = DEAL_INDICES[order]
+    return perms
+
+def lowest_moves(hands: np.ndarray, last_type: np.ndarray, last_rank: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    count = hands.shape[0]
+    rows = np.arange(count)
+    by_value = hands.reshape(count, 13, 4)
+    value_counts = by_value.sum(2)
+    suit_order = by_value.cumsum(2)
+
+    moves = np.zeros((count, NUM_CARDS), dtype=bool)
+    move_type = np.zeros(count, dtype=np.int8)
+    move_rank = np.zeros(count, dtype=np.int32)
+
+    lead = np.flatnonzero(last_type == NO_HAND)
+    if lead.size:
+        index = hands[lead].argmax(1)
+        moves[lead, index] = True
+        move_type[lead] = SINGLE
+        move_rank[lead] = SORT_VALUES[index]
+
+    group = np.flatnonzero(last_type == SINGLE)
+    if group.size:
+        rank = last_rank[group]
+        last_index = np.where(rank == 0, 0, (rank // 10 - 3) * 4 + rank % 10)
+        beaters = hands[group] & (CARD_INDICES > last_index[:, None])
+        found = beaters.any(1)
+        group, index = group[found], beaters[found].argmax(1)
+        moves[group, index] = True
+        move_type[group] = SINGLE
+        move_rank[group] = SORT_VALUES[index]
+
+    group = np.flatnonzero(last_type == PAIR)
+    if group.size:
+        rank = last_rank[group]
+        last_value = rank // 100 - 3
+        last_suit = rank % 100
+        suits = by_value[group, last_value]
+        low_suit = suits.argmax(1)
+        high_suits = suits & (SUIT_INDICES > np.maximum(last_suit, low_suit)[:, None])
+        same_value = high_suits.any(1)
+        higher = (value_counts[group] >= 2) & (VALUE_INDICES > last_value[:, None])
+        higher_found = higher.any(1)
+        higher_value = higher.argmax(1)
+
+        play_same = group[same_value]
+        high_suit = high_suits[same_value].argmax(1)
+        value = last_value[same_value]
+        moves[play_same, value * 4 + low_suit[same_value]] = True
+        moves[play_same, value * 4 + high_suit] = True
+        move_type[play_same] = PAIR
+        move_rank[play_same] = (value + 3) * 100 + high_suit
+
+        pick = ~same_value & higher_found
+        play_higher = group[pick]
+        value = higher_value[pick]
+        chosen = by_value[play_higher, value] & (suit_order[play_higher, value] <= 2)
+        moves[play_higher] |= _spread(chosen, value)
+        move_type[play_higher] = PAIR
+        move_rank[play_higher] = (value + 3) * 100 + (3 - chosen[:, ::-1].argmax(1))
+
+    for hand_type, divisor, size in ((TRIPLE, 1000, 3), (QUAD, 10000, 4)):
+        group = np.flatnonzero(last_type == hand_type)
+        if not group.size:
+            continue
+        last_value = last_rank[group] // divisor - 3
+        beaters = (value_counts[group] >= size) & (VALUE_INDICES > last_value[:, None])
+        found = beaters.any(1)
+        group, value = group[found], beaters[found].argmax(1)
+        chosen = by_value[group, value] & (suit_order[group, value] <= size)
+        moves[group] |= _spread(chosen, value)
+        move_type[group] = hand_type
+        move_rank[group] = (value + 3) * divisor
+
+    group = np.flatnonzero(last_type == STRAIGHT)
+    if group.size:
+        last_top = last_rank[group] // 100 - 3
+        present = value_counts[group] > 0
+        runs = present[:, 0:9] & present[:, 1:10] & present[:, 2:11] & present[:, 3:12] & present[:, 4:13]
+        runs &= (np.arange(9) + 4) > last_top[:, None]
+        found = runs.any(1)
+        group, start = group[found], runs[found].argmax(1)
+        for offset in range(5):
+            value = start + offset
+            suit = by_value[group, value].argmax(1)
+            moves[group, value * 4 + suit] = True
+        move_type[group] = STRAIGHT
+        move_rank[group] = (start + 7) * 100
+
+    return moves, move_type, move_rank
+
+def _spread(suits: np.ndarray, value: np.ndarray) -> np.ndarray:
+    spread = np.zeros((suits.shape[0], 13, 4), dtype=bool)
+    spread[np.arange(suits.shape[0]), value] = suits
+    return spread.reshape(suits.shape[0], NUM_CARDS)
+
+class BatchGame:
+    def __init__(self, perms: np.ndarray, pass_prob: float = 0.0, rng: Optional[np.random.Generator] = None):
+        count = perms.shape[0]
+        self.hands = np.zeros((count, 4, NUM_CARDS), dtype=bool)
+        self.hands[np.arange(count)[:, None], CARD_INDICES[None, :] % 4, perms] = True
+        self.current = self.hands[:, :, 0].argmax(1).astype(np.int8)
+        self.last_type = np.zeros(count, dtype=np.int8)
+        self.last_rank = np.zeros(count, dtype=np.int32)
+        self.passes = np.zeros(count, dtype=np.int8)
+        self.winner = np.full(count, -1, dtype=np.int8)
+        self.turns = np.zeros(count, dtype=np.int32)
+        self.pass_count = np.zeros(count, dtype=np.int32)
+        self.pass_prob = pass_prob
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    def active(self) -> np.ndarray:
+        return np.flatnonzero((self.winner < 0) & (self.turns < MAX_TURNS))
+
+    def step(self) -> bool:
+        games = self.active()
+        if not games.size:
+            return False
+
+        seats = self.current[games]
+        hands = self.hands[games, seats]
+        last_type = self.last_type[games]
+        moves, move_type, move_rank = lowest_moves(hands, last_type, self.last_rank[games])
+
+        plays = move_type != NO_HAND
+        if self.pass_prob:
+            plays &= (last_type == NO_HAND) | (self.rng.random(games.size) >= self.pass_prob)
+
+        played = games[plays]
+        remaining = hands[plays] & ~moves[plays]
+        self.hands[played, seats[plays]] = remaining
+        self.last_type[played] = move_type[plays]
+        self.last_rank[played] = move_rank[plays]
+        self.passes[played] = 0
+        won = ~remaining.any(1)
+        self.winner[played[won]] = seats[plays][won]
+
+        passed = games[~plays]
+        self.passes[passed] += 1
+        self.pass_count[passed] += 1
+        self.turns[games] += 1
+
+        moving = games[self.winner[games] < 0]
+        self.current[moving] = (self.current[moving] - 1) % 4
+        reset = moving[self.passes[moving] >= 3]
+        self.last_type[reset] = NO_HAND
+        self.last_rank[reset] = 0
+        self.passes[reset] = 0
+        return True
+
+    def run(self):
+        while self.step():
+            pass
+
+    def results(self) -> List[Tuple[Optional[int], int, int, int]]:
+        cards_left = self.hands.sum((1, 2))
+        return [
+            (int(winner) if winner >= 0 else None, int(turns), int(passes), int(left))
+            for winner, turns, passes, left in zip(self.winner, self.turns, self.pass_count, cards_left)
+        ]
+
+def run_batch(games: int, seed: int = 0, batch_size: int = 10000, pass_prob: float = 0.0) -> SimulationStats:
+    stats = SimulationStats()
+    rng = np.random.default_rng(seed)
+    for start in range(0, games, batch_size):
+        count = min(batch_size, games - start)
+        batch = BatchGame(deal_permutations(seed, start, count), pass_prob, rng)
+        batch.run()
+        for result in batch.results():
+            stats.add(*result)
+    return stats
+
+def check_batch(games: int, seed: int = 0) -> List[int]:
+    batch = BatchGame(deal_permutations(seed, 0, games))
+    batch.run()
+    return [
+        index for index, result in enumerate(batch.results())
+        if result != play_game(game_rng(seed, index))
+    ]
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Lockstep NumPy simulation of many Tien Len games")
+    parser.add_argument("-n", "--games", type=int, default=100000)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("-b", "--batch-size", type=int, default=10000)
+    parser.add_argument("--pass-prob", type=float, default=0.0, help="chance to pass instead of beating a hand")
+    parser.add_argument("--check", type=int, default=0, metavar="N", help="compare the first N games with simulate.play_game and exit")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        mismatches = check_batch(args.check, args.seed)
+        print(f"checked: {args.check}")
+        print(f"mismatches: {len(mismatches)}")
+        if mismatches:
+            print(f"first_mismatch: {mismatches[0]}")
+            raise SystemExit(1)
+        return
+
+    start_time = time.perf_counter()
+    stats = run_batch(args.games, args.seed, args.batch_size, args.pass_prob)
+    elapsed = time.perf_counter() - start_time
+
+    for key, value in stats.summary().items():
+        print(f"{key}: {value}")
+    print(f"games_per_second: {stats.games / elapsed:.1f}")
+
+if __name__ == "__main__":
+    main()
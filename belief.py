@@ -0,0 +1,192 @@
+import random
+from typing import List, Optional, Tuple
+
+from cards import FULL_DECK, NUM_CARDS, HandType, VALUE_MASK, iter_indices
+from movegen import NUM_VALUES, SUIT_COUNTS
+
+MAX_ATTEMPTS = 20
+HELD_CAPS = {HandType.PAIR: (100, 1), HandType.TRIPLE: (1000, 2), HandType.QUAD: (10000, 3)}
+
+Constraints = Tuple[List[int], List[List[int]]]
+
+def single_index(rank: int) -> int:
+    return 0 if rank == 0 else (rank // 10 - 3) * 4 + rank % 10
+
+def within_caps(holding: int, caps: List[int]) -> bool:
+    for value, cap in enumerate(caps):
+        if cap < 4 and SUIT_COUNTS[holding >> (value * 4) & VALUE_MASK] > cap:
+            return False
+    return True
+
+def _deal_shuffled(unseen: List[int], seat: int, own: int, counts: List[int]) -> List[int]:
+    holdings = []
+    position = 0
+    for other, count in enumerate(counts):
+        if other == seat:
+            holdings.append(own)
+            continue
+        mask = 0
+        for index in unseen[position:position + count]:
+            mask |= 1 << index
+        position += count
+        holdings.append(mask)
+    return holdings
+
+def _deal_constrained(rng: random.Random, cards: List[int], seat: int, own: int, counts: List[int],
+                      excluded: List[int], caps: List[List[int]]) -> Optional[List[int]]:
+    room = list(counts)
+    room[seat] = 0
+    holdings = [0, 0, 0, 0]
+    holdings[seat] = own
+    restricted = excluded[0] | excluded[1] | excluded[2] | excluded[3]
+    free = []
+    for index in cards:
+        bit = 1 << index
+        if not restricted & bit:
+            free.append(index)
+            continue
+        total = 0
+        for other in range(4):
+            if room[other] and not excluded[other] & bit:
+                total += room[other]
+        if not total:
+            return None
+        pick = rng.randrange(total)
+        for other in range(4):
+            if room[other] and not excluded[other] & bit:
+                pick -= room[other]
+                if pick < 0:
+                    break
+        holdings[other] |= bit
+        room[other] -= 1
+
+    position = 0
+    for other in range(4):
+        mask = 0
+        for index in free[position:position + room[other]]:
+            mask |= 1 << index
+        position += room[other]
+        holdings[other] |= mask
+        if other != seat and not within_caps(holdings[other], caps[other]):
+            return None
+    return holdings
+
+def sample_holdings(rng: random.Random, seat: int, own: int, unseen: int, counts: List[int],
+                    constraints: Optional[Constraints] = None) -> List[int]:
+    cards = [index for index in range(NUM_CARDS) if unseen >> index & 1]
+    rng.shuffle(cards)
+    if constraints is None:
+        return _deal_shuffled(cards, seat, own, counts)
+
+    excluded, caps = constraints
+    strictness = [0] * NUM_CARDS
+    for mask in excluded:
+        for index in iter_indices(mask & unseen):
+            strictness[index] -= 1
+    for _ in range(MAX_ATTEMPTS):
+        cards.sort(key=strictness.__getitem__)
+        holdings = _deal_constrained(rng, cards, seat, own, counts, excluded, caps)
+        if holdings is not None:
+            return holdings
+        rng.shuffle(cards)
+    return _deal_shuffled(cards, seat, own, counts)
+
+class BeliefTracker:
+    def __init__(self):
+        self.reset()
+
+    def reset(self, game=None):
+        self.played = 0
+        self.counts = [player.mask.bit_count() for player in game.players] if game is not None else [13] * 4
+        self.excluded = [0] * 4
+        self.caps = [[4] * NUM_VALUES for _ in range(4)]
+        self.constrained = [False] * 4
+
+    def on_play(self, seat: int, mask: int):
+        self.played |= mask
+        self.counts[seat] -= mask.bit_count()
+        if not self.constrained[seat]:
+            return
+        caps = self.caps[seat]
+        for index in iter_indices(mask):
+            caps[index >> 2] -= 1
+        if mask & self.excluded[seat] or min(caps) < 0:
+            self.forget(seat)
+
+    def on_pass(self, seat: int, last_hand):
+        if last_hand is None or last_hand.hand_type is None:
+            return
+        hand_type, rank = last_hand.hand_type, last_hand.rank
+        if hand_type == HandType.SINGLE:
+            self.excluded[seat] |= FULL_DECK & ~((2 << single_index(rank)) - 1)
+            self.constrained[seat] = True
+        elif hand_type in HELD_CAPS:
+            divisor, cap = HELD_CAPS[hand_type]
+            caps = self.caps[seat]
+            for value in range(rank // divisor - 2, NUM_VALUES):
+                caps[value] = min(caps[value], cap)
+            self.constrained[seat] = True
+
+    def forget(self, seat: int):
+        self.excluded[seat] = 0
+        self.caps[seat] = [4] * NUM_VALUES
+        self.constrained[seat] = False
+
+    def unseen(self, own: int) -> int:
+        return FULL_DECK & ~self.played & ~own
+
+    def constraints(self, seat: int) -> Optional[Constraints]:
+        others = [other for other in range(4) if other != seat and self.constrained[other]]
+        if not others:
+            return None
+        excluded = [0] * 4
+        caps = [[4] * NUM_VALUES for _ in range(4)]
+        for other in others:
+            excluded[other] = self.excluded[other]
+            caps[other] = list(self.caps[other])
+        return excluded, caps
+
+    def sample(self, seat: int, own: int, rng: random.Random) -> List[int]:
+        return sample_holdings(rng, seat, own, self.unseen(own), self.counts, self.constraints(seat))
+
+    def sample_batch(self, seat: int, own: int, count: int, rng=None):
+        import numpy as np
+
+        rng = rng if rng is not None else np.random.default_rng()
+        suit_counts = np.array(SUIT_COUNTS)
+        cards = np.array(list(iter_indices(self.unseen(own))), dtype=np.uint64)
+        bits = np.left_shift(np.uint64(1), cards)
+        constraints = self.constraints(seat)
+        others = [other for other in range(4) if other != seat]
+        ends = np.cumsum([self.counts[other] for other in others])
+        starts = ends - [self.counts[other] for other in others]
+
+        result = np.empty((count, 4), dtype=np.uint64)
+        result[:, seat] = own
+        filled = 0
+        for _ in range(MAX_ATTEMPTS):
+            need = count - filled
+            dealt = bits[rng.random((need, len(bits))).argsort(1)]
+            ok = np.ones(need, dtype=bool)
+            holdings = []
+            for other, start, end in zip(others, starts, ends):
+                holding = np.bitwise_or.reduce(dealt[:, start:end], axis=1) if end > start else np.zeros(need, np.uint64)
+                if constraints is not None:
+                    excluded, caps = constraints
+                    ok &= (holding & np.uint64(excluded[other])) == 0
+                    for value, cap in enumerate(caps[other]):
+                        if cap < 4:
+                            suits = (holding >> np.uint64(value * 4)) & np.uint64(VALUE_MASK)
+                            ok &= suit_counts[suits.astype(np.intp)] <= cap
+                holdings.append(holding)
+            rows = np.flatnonzero(ok)
+            for other, holding in zip(others, holdings):
+                result[filled:filled + rows.size, other] = holding[rows]
+            filled += rows.size
+            if filled == count:
+                return result
+
+        fallback = random.Random(int(rng.integers(1 << 62)))
+        for row in range(filled, count):
+            result[row] = self.sample(seat, own, fallback)
+        return result
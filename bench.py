@@ -0,0 +1,232 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from cards import DECK, HandType, legal_hand_masks, lookup_hand
+from engine import Game, Hand
+from rules import FULL_RULES, SIMPLE_RULES, RuleSet
+from simulate import game_rng, play_game
+
+SEED = 12345
+
+Benchmark = Callable[[], Tuple[Callable[[], None], int]]
+
+def bench_hand_construction() -> Tuple[Callable[[], None], int]:
+    rng = random.Random(SEED)
+    samples = [rng.sample(DECK, rng.randint(1, 5)) for _ in range(5000)]
+
+    def run():
+        for cards in samples:
+            Hand(cards)
+    return run, len(samples)
+
+def bench_can_beat() -> Tuple[Callable[[], None], int]:
+    rng = random.Random(SEED)
+    masks = list(legal_hand_masks())
+    pairs = [(Hand.from_mask(rng.choice(masks)), Hand.from_mask(rng.choice(masks))) for _ in range(20000)]
+
+    def run():
+        for hand, other in pairs:
+            hand.can_beat(other)
+    return run, len(pairs)
+
+def last_hand_masks(hand_type: HandType, rules: RuleSet, rng: random.Random) -> List[int]:
+    masks = [mask for mask in legal_hand_masks() if lookup_hand(mask)[0] == hand_type]
+    while len(masks) < 100:
+        holding = sum(1 << index for index in rng.sample(range(len(DECK)), 13))
+        masks.extend(mask for mask in rules.generate_from_mask(holding) if rules.lookup(mask)[0] == hand_type)
+    return masks
+
+def valid_moves_positions(hand_type: HandType, rules: RuleSet = SIMPLE_RULES, count: int = 500) -> List[Game]:
+    rng = random.Random(SEED + hand_type.value)
+    last_hands = last_hand_masks(hand_type, rules, rng)
+    games = []
+    for _ in range(count):
+        deck = list(DECK)
+        rng.shuffle(deck)
+        game = Game(rules=rules)
+        game.deal_cards(deck)
+        game.last_hand = Hand.from_mask(rng.choice(last_hands), rules)
+        game.last_player = (game.current_player + 1) % 4
+        games.append(game)
+    return games
+
+def bench_valid_moves(hand_type: HandType, rules: RuleSet = SIMPLE_RULES) -> Benchmark:
+    def setup():
+        games = valid_moves_positions(hand_type, rules)
+
+        def run():
+            for game in games:
+                game.get_valid_moves(game.players[game.current_player])
+        return run, len(games)
+    return setup
+
+def bench_deal_cards() -> Tuple[Callable[[], None], int]:
+    count = 2000
+
+    def run():
+        rng = random.Random(SEED)
+        for _ in range(count):
+            Game(rng).deal_cards()
+    return run, count
+
+def bench_full_game(rules: RuleSet) -> Benchmark:
+    def setup():
+        count = 200
+
+        def run():
+            for index in range(count):
+                play_game(game_rng(SEED, index), rules=rules)
+        return run, count
+    return setup
+
+def render_setup():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    import main as ui
+
+    if ui.screen is None:
+        ui.init_display()
+    game = Game(random.Random(SEED))
+    game.deal_cards()
+    for _ in range(8):
+        game.ai_play(game.players[game.current_player])
+    return ui, game
+
+def bench_draw_player_cards() -> Tuple[Callable[[], None], int]:
+    ui, game = render_setup()
+    count = 200
+
+    def run():
+        for _ in range(count):
+            for i, player in enumerate(game.players):
+                x, y, horizontal = ui.PLAYER_POSITIONS[i]
+                ui.draw_player_cards(ui.screen, player, x, y, i == 0, i == 0, horizontal)
+    return run, count
+
+def bench_table_frame() -> Tuple[Callable[[], None], int]:
+    ui, game = render_setup()
+    count = 200
+
+    def run():
+        for _ in range(count):
+            ui.draw_table(ui.screen, game)
+    return run, count
+
+BENCHMARKS: Dict[str, Benchmark] = {
+    "hand_construction": bench_hand_construction,
+    "can_beat": bench_can_beat,
+    "deal_cards": bench_deal_cards,
+    "full_game": bench_full_game(SIMPLE_RULES),
+    "full_game_full_rules": bench_full_game(FULL_RULES),
+    "draw_player_cards": bench_draw_player_cards,
+    "table_frame": bench_table_frame,
+}
+for _hand_type in SIMPLE_RULES.by_type:
+    BENCHMARKS[f"valid_moves_{_hand_type.name.lower()}"] = bench_valid_moves(_hand_type)
+for _hand_type in FULL_RULES.by_type:
+    if _hand_type not in SIMPLE_RULES.by_type:
+        BENCHMARKS[f"valid_moves_{_hand_type.name.lower()}"] = bench_valid_moves(_hand_type, FULL_RULES)
+
+def run_benchmark(setup: Benchmark, repeat: int) -> Dict[str, float]:
+    run, ops = setup()
+    run()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    times.sort()
+    return {
+        "ops": ops,
+        "best_seconds": best,
+        "median_seconds": times[len(times) // 2],
+        "per_op_us": best / ops * 1e6,
+        "ops_per_second": ops / best,
+    }
+
+def run_suite(names: List[str], repeat: int) -> Dict:
+    results = {}
+    for name in names:
+        try:
+            results[name] = run_benchmark(BENCHMARKS[name], repeat)
+        except ImportError as e:
+            results[name] = {"skipped": str(e)}
+        print(f"{name}: {format_result(results[name])}", file=sys.stderr)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "seed": SEED,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+def format_result(result: Dict[str, float]) -> str:
+    if "skipped" in result:
+        return f"skipped ({result['skipped']})"
+    return f"{result['per_op_us']:.2f} us/op, {result['ops_per_second']:.0f} ops/s"
+
+def compare(current: Dict, baseline: Dict, threshold: float, out=sys.stdout) -> List[str]:
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None or "skipped" in result or "skipped" in base:
+            continue
+        ratio = result["per_op_us"] / base["per_op_us"]
+        status = "ok"
+        if ratio > 1 + threshold:
+            status = "REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            status = "faster"
+        print(f"{name:28} {base['per_op_us']:12.2f} -> {result['per_op_us']:12.2f} us/op  x{ratio:5.2f}  {status}", file=out)
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Seeded benchmarks for the rules engine and renderer")
+    parser.add_argument("--only", help="comma-separated benchmark names")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against a saved JSON result")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before flagging (0.10 = 10%%)")
+    parser.add_argument("--list", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return 0
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    current = run_suite(names, args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+    else:
+        print(json.dumps(current, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        out = sys.stdout if args.output else sys.stderr
+        regressions = compare(current, baseline, args.threshold, out)
+        if regressions:
+            print(f"regressions: {', '.join(regressions)}", file=out)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
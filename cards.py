@@ -0,0 +1,195 @@
+import os
+from array import array
+from enum import Enum
+from itertools import combinations, product
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+class Suit(Enum):
+    SPADES = 0
+    CLUBS = 1
+    DIAMONDS = 2
+    HEARTS = 3
+
+class Card:
+    __slots__ = ("suit", "value", "index", "bit", "_sort_value")
+    
+    def __new__(cls, suit: Suit, value: int):
+        return DECK[(value - 3) * 4 + suit.value]
+    
+    @classmethod
+    def _intern(cls, index: int) -> "Card":
+        card = object.__new__(cls)
+        suit = Suit(index & 3)
+        value = (index >> 2) + 3
+        object.__setattr__(card, "suit", suit)
+        object.__setattr__(card, "value", value)
+        object.__setattr__(card, "index", index)
+        object.__setattr__(card, "bit", 1 << index)
+        object.__setattr__(card, "_sort_value", 0 if index == 0 else value * 10 + suit.value)
+        return card
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("Card is immutable")
+    
+    def __reduce__(self):
+        return Card, (self.suit, self.value)
+        
+    def get_display_value(self):
+        if self.value <= 10:
+            return str(self.value)
+        elif self.value == 11:
+            return "J"
+        elif self.value == 12:
+            return "Q"
+        elif self.value == 13:
+            return "K"
+        elif self.value == 14:
+            return "A"
+        elif self.value == 15:
+            return "2"
+    
+    def get_suit_symbol(self):
+        symbols = {Suit.SPADES: "♠", Suit.CLUBS: "♣", Suit.DIAMONDS: "♦", Suit.HEARTS: "♥"}
+        return symbols[self.suit]
+    
+    def get_sort_value(self):
+        return self._sort_value
+    
+    def __lt__(self, other):
+        return self.index < other.index
+    
+    def __eq__(self, other):
+        return isinstance(other, Card) and self.index == other.index
+    
+    def __hash__(self):
+        return self.index
+    
+    def __repr__(self):
+        return f"Card({self.suit}, {self.value})"
+
+class HandType(Enum):
+    SINGLE = 1
+    PAIR = 2
+    TRIPLE = 3
+    QUAD = 4
+    STRAIGHT = 5
+    PAIR_SEQUENCE = 6
+
+NUM_CARDS = 52
+FULL_DECK = (1 << NUM_CARDS) - 1
+VALUE_MASK = 0xF
+
+DECK: Tuple[Card, ...] = tuple(Card._intern(index) for index in range(NUM_CARDS))
+
+def cards_to_mask(cards: Iterable[Card]) -> int:
+    mask = 0
+    for card in cards:
+        mask |= card.bit
+    return mask
+
+def iter_indices(mask: int) -> Iterator[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+def mask_to_cards(mask: int) -> List[Card]:
+    return [DECK[index] for index in iter_indices(mask)]
+
+def sort_value(index: int) -> int:
+    if index == 0:
+        return 0
+    return ((index >> 2) + 3) * 10 + (index & 3)
+
+def classify_mask(mask: int) -> Optional[Tuple[HandType, int]]:
+    count = mask.bit_count()
+    if count == 0:
+        return None
+
+    low = (mask & -mask).bit_length() - 1
+    low_value = low >> 2
+    value = low_value + 3
+
+    if count == 1:
+        return HandType.SINGLE, sort_value(low)
+
+    if count <= 4:
+        if mask >> ((low_value + 1) * 4):
+            return None
+        if count == 2:
+            high = mask.bit_length() - 1
+            return HandType.PAIR, value * 100 + (high & 3)
+        if count == 3:
+            return HandType.TRIPLE, value * 1000
+        return HandType.QUAD, value * 10000
+
+    if count == 5:
+        if low_value + 5 > 13 or mask >> ((low_value + 5) * 4):
+            return None
+        for offset in range(5):
+            suits = (mask >> ((low_value + offset) * 4)) & VALUE_MASK
+            if suits == 0 or suits & (suits - 1):
+                return None
+        return HandType.STRAIGHT, (value + 4) * 100
+
+    return None
+
+INVALID_HAND = (None, 0)
+HAND_TABLE_PATH = os.environ.get("TIENLEN_HAND_TABLE")
+
+_hand_table: Optional[Dict[int, Tuple[HandType, int]]] = None
+
+def legal_hand_masks() -> Iterator[int]:
+    for index in range(NUM_CARDS):
+        yield 1 << index
+    
+    for value in range(13):
+        shift = value * 4
+        for size in (2, 3, 4):
+            for suits in combinations(range(4), size):
+                mask = 0
+                for suit in suits:
+                    mask |= 1 << (shift + suit)
+                yield mask
+    
+    for start in range(13 - 4):
+        for suits in product(range(4), repeat=5):
+            mask = 0
+            for offset, suit in enumerate(suits):
+                mask |= 1 << ((start + offset) * 4 + suit)
+            yield mask
+
+def build_hand_table() -> Dict[int, Tuple[HandType, int]]:
+    return {mask: classify_mask(mask) for mask in legal_hand_masks()}
+
+def save_hand_table(table: Dict[int, Tuple[HandType, int]], path: str):
+    masks = array("Q", table.keys())
+    infos = array("I", (hand_type.value << 24 | rank for hand_type, rank in table.values()))
+    with open(path, "wb") as f:
+        array("I", [len(masks)]).tofile(f)
+        masks.tofile(f)
+        infos.tofile(f)
+
+def load_hand_table(path: str) -> Dict[int, Tuple[HandType, int]]:
+    with open(path, "rb") as f:
+        count = array("I")
+        count.fromfile(f, 1)
+        masks = array("Q")
+        masks.fromfile(f, count[0])
+        infos = array("I")
+        infos.fromfile(f, count[0])
+    return {mask: (HandType(info >> 24), info & 0xFFFFFF) for mask, info in zip(masks, infos)}
+
+def hand_table() -> Dict[int, Tuple[HandType, int]]:
+    global _hand_table
+    if _hand_table is None:
+        if HAND_TABLE_PATH and os.path.exists(HAND_TABLE_PATH):
+            _hand_table = load_hand_table(HAND_TABLE_PATH)
+        else:
+            _hand_table = build_hand_table()
+            if HAND_TABLE_PATH:
+                save_hand_table(_hand_table, HAND_TABLE_PATH)
+    return _hand_table
+
+def lookup_hand(mask: int) -> Tuple[Optional[HandType], int]:
+    return (_hand_table or hand_table()).get(mask, INVALID_HAND)
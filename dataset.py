@@ -0,0 +1,239 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from array import array
+from multiprocessing import Pool
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from cards import NUM_CARDS
+from engine import Game
+from simulate import MAX_TURNS, game_rng
+from tournament import create_policy, reseed
+
+MASKS_PER_STATE = 7
+SCALARS_PER_STATE = 8
+NO_OUTCOME = -1
+
+STATE_DTYPE = np.dtype([
+    ("hand", np.uint8, NUM_CARDS),
+    ("played", np.uint8, (4, NUM_CARDS)),
+    ("last", np.uint8, NUM_CARDS),
+    ("last_type", np.int8),
+    ("last_rank", np.int32),
+    ("passes", np.int8),
+    ("counts", np.int8, 4),
+    ("move", np.uint8, NUM_CARDS),
+    ("won", np.int8),
+])
+
+CARD_SHIFTS = np.arange(NUM_CARDS, dtype=np.uint64)
+
+class StateRecorder:
+    def __init__(self, game: Game):
+        self.game = game
+        self.masks = array("Q")
+        self.scalars = array("i")
+        self.played = [0, 0, 0, 0]
+        self.game_start = 0
+
+    def start_game(self, deal: List[int]):
+        self.played = [0, 0, 0, 0]
+        self.game_start = len(self.scalars)
+
+    def record(self, seat: int, mask: int):
+        game = self.game
+        players = game.players
+        last_hand = game.last_hand
+        order = [(seat - offset) % 4 for offset in range(4)]
+        self.masks.append(players[seat].mask)
+        self.masks.extend(self.played[other] for other in order)
+        self.masks.append(last_hand.mask if last_hand else 0)
+        self.masks.append(mask)
+        self.scalars.append(last_hand.hand_type.value if last_hand and last_hand.hand_type else 0)
+        self.scalars.append(last_hand.rank if last_hand else 0)
+        self.scalars.append(game.passes)
+        self.scalars.extend(players[other].mask.bit_count() for other in order)
+        self.scalars.append(seat)
+        self.played[seat] |= mask
+
+    def end_game(self, winner: Optional[int]):
+        for row in range(self.game_start, len(self.scalars), SCALARS_PER_STATE):
+            seat = self.scalars[row + 7]
+            self.scalars[row + 7] = NO_OUTCOME if winner is None else int(seat == winner)
+        self.game_start = len(self.scalars)
+
+    def __len__(self) -> int:
+        return self.game_start // SCALARS_PER_STATE
+
+    def take(self, count: int) -> np.ndarray:
+        features = to_features(self.masks[:count * MASKS_PER_STATE], self.scalars[:count * SCALARS_PER_STATE])
+        del self.masks[:count * MASKS_PER_STATE]
+        del self.scalars[:count * SCALARS_PER_STATE]
+        self.game_start -= count * SCALARS_PER_STATE
+        return features
+
+def unpack_masks(masks: np.ndarray) -> np.ndarray:
+    return ((masks[..., None] >> CARD_SHIFTS) & np.uint64(1)).astype(np.uint8)
+
+def to_features(masks: array, scalars: array) -> np.ndarray:
+    masks = np.frombuffer(masks, dtype=np.uint64).reshape(-1, MASKS_PER_STATE)
+    scalars = np.frombuffer(scalars, dtype=np.int32).reshape(-1, SCALARS_PER_STATE)
+    bits = unpack_masks(masks)
+    features = np.empty(len(masks), dtype=STATE_DTYPE)
+    features["hand"] = bits[:, 0]
+    features["played"] = bits[:, 1:5]
+    features["last"] = bits[:, 5]
+    features["move"] = bits[:, 6]
+    features["last_type"] = scalars[:, 0]
+    features["last_rank"] = scalars[:, 1]
+    features["passes"] = scalars[:, 2]
+    features["counts"] = scalars[:, 3:7]
+    features["won"] = scalars[:, 7]
+    return features
+
+class ShardWriter:
+    def __init__(self, directory: str, prefix: str, shard_size: int = 1 << 16):
+        self.directory = directory
+        self.prefix = prefix
+        self.shard_size = shard_size
+        self.shards = 0
+        self.states = 0
+
+    def write(self, features: np.ndarray):
+        path = os.path.join(self.directory, f"{self.prefix}-{self.shards:05d}.npy")
+        partial = path + ".tmp"
+        shard = np.lib.format.open_memmap(partial, mode="w+", dtype=STATE_DTYPE, shape=features.shape)
+        shard[:] = features
+        shard.flush()
+        del shard
+        os.replace(partial, path)
+        self.shards += 1
+        self.states += len(features)
+
+    def drain(self, recorder: StateRecorder, final: bool = False):
+        while len(recorder) >= self.shard_size:
+            self.write(recorder.take(self.shard_size))
+        if final and len(recorder):
+            self.write(recorder.take(len(recorder)))
+
+def export_chunk(args: Tuple[int, int, int, Tuple[str, ...], str, int]) -> Tuple[int, int]:
+    seed, start, stop, specs, directory, shard_size = args
+    policies = [create_policy(spec) for spec in specs]
+    if len(policies) == 1:
+        policies *= 4
+    writer = ShardWriter(directory, f"states-{seed}-{start:010d}", shard_size)
+    recorder = None
+
+    for index in range(start, stop):
+        game = Game(game_rng(seed, index))
+        if recorder is None:
+            recorder = StateRecorder(game)
+        recorder.game = game
+        game.recorder = recorder
+        for seat, player in enumerate(game.players):
+            player.is_human = False
+            player.policy = policies[seat]
+            reseed(policies[seat], f"{seed}:{index}:{seat}")
+        game.deal_cards()
+
+        turns = 0
+        while not game.winner and turns < MAX_TURNS:
+            game.ai_play(game.players[game.current_player])
+            turns += 1
+        if not game.winner:
+            recorder.end_game(None)
+        writer.drain(recorder)
+
+    if recorder is not None:
+        writer.drain(recorder, final=True)
+    return stop - start, writer.states
+
+def export_games(directory: str, games: int, seed: int = 0, workers: int = 1, specs: Tuple[str, ...] = ("lowest",),
+                 chunk_size: int = 512, shard_size: int = 1 << 16) -> Iterator[Tuple[int, int]]:
+    os.makedirs(directory, exist_ok=True)
+    chunks = [(seed, start, min(start + chunk_size, games), specs, directory, shard_size)
+              for start in range(0, games, chunk_size)]
+    if workers <= 1:
+        for chunk in chunks:
+            yield export_chunk(chunk)
+        return
+
+    with Pool(workers) as pool:
+        for result in pool.imap_unordered(export_chunk, chunks):
+            yield result
+
+class FeatureDataset:
+    def __init__(self, directory: str):
+        self.paths = sorted(glob.glob(os.path.join(directory, "*.npy")))
+        self.shards = [np.load(path, mmap_mode="r") for path in self.paths]
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self.shards)
+
+    def batches(self, batch_size: int = 1024, shuffle: bool = False,
+                rng: Optional[np.random.Generator] = None) -> Iterator[np.ndarray]:
+        rng = rng if rng is not None else np.random.default_rng()
+        order = rng.permutation(len(self.shards)) if shuffle else range(len(self.shards))
+        pending = []
+        pending_size = 0
+        for shard_index in order:
+            shard = self.shards[shard_index]
+            rows = rng.permutation(len(shard)) if shuffle else None
+            for start in range(0, len(shard), batch_size):
+                if rows is None:
+                    part = shard[start:start + batch_size]
+                else:
+                    part = shard[np.sort(rows[start:start + batch_size])]
+                if not pending and len(part) == batch_size:
+                    yield part
+                    continue
+                pending.append(part)
+                pending_size += len(part)
+                if pending_size >= batch_size:
+                    joined = np.concatenate(pending)
+                    yield joined[:batch_size]
+                    pending = [joined[batch_size:]]
+                    pending_size = len(pending[0])
+        if pending_size:
+            yield np.concatenate(pending)
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Export self-play states as NumPy feature shards")
+    parser.add_argument("directory")
+    parser.add_argument("-n", "--games", type=int, default=10000)
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("--policies", default="lowest", help="one policy spec for every seat, or four separated by commas")
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--shard-size", type=int, default=1 << 16, help="states per .npy shard")
+    parser.add_argument("--info", action="store_true", help="print the size of an existing dataset and exit")
+    args = parser.parse_args(argv)
+
+    if args.info:
+        dataset = FeatureDataset(args.directory)
+        print(f"shards: {len(dataset.shards)}")
+        print(f"states: {len(dataset)}")
+        print(f"bytes_per_state: {STATE_DTYPE.itemsize}")
+        return
+
+    specs = tuple(args.policies.split(","))
+    if len(specs) not in (1, 4):
+        parser.error("--policies needs one spec or four")
+    start_time = time.perf_counter()
+    games = states = 0
+    for chunk_games, chunk_states in export_games(args.directory, args.games, args.seed, args.workers, specs,
+                                                  args.chunk_size, args.shard_size):
+        games += chunk_games
+        states += chunk_states
+        print(f"\r{games}/{args.games} games", end="", file=sys.stderr)
+    print(file=sys.stderr)
+    elapsed = time.perf_counter() - start_time
+    print(f"states: {states}")
+    print(f"states_per_second: {states / elapsed:.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import random
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from cards import mask_to_cards
+from engine import PASS, Card, Game, Player
+from ismcts import Observation
+from rules import SIMPLE_RULES, RuleSet
+
+Position = Tuple[Tuple[int, int, int, int], int, int, int]
+
+class EndgameSolver:
+    def __init__(self, max_entries: int = 1_000_000, rules: RuleSet = SIMPLE_RULES):
+        self.max_entries = max_entries
+        self.rules = rules
+        self.table: "OrderedDict[Position, int]" = OrderedDict()
+        self.nodes = 0
+        self.lookups = 0
+        self.hits = 0
+        self.evictions = 0
+        self.elapsed = 0.0
+
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "entries": len(self.table),
+            "nodes": self.nodes,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": self.hit_rate(),
+            "evictions": self.evictions,
+            "nodes_per_second": self.nodes_per_second(),
+        }
+
+    def clear(self):
+        self.table.clear()
+
+    def moves(self, holdings: Tuple[int, int, int, int], current_player: int, last_mask: int) -> List[int]:
+        holding = holdings[current_player]
+        if not last_mask:
+            return self.rules.generate_from_mask(holding)
+        moves = self.rules.responses(holding, last_mask)
+        moves.append(PASS)
+        return moves
+
+    def child(self, position: Position, move: int) -> Tuple[Position, Optional[int]]:
+        holdings, current_player, last_mask, passes = position
+        if move == PASS:
+            passes += 1
+        else:
+            holdings = tuple(mask ^ move if seat == current_player else mask for seat, mask in enumerate(holdings))
+            if not holdings[current_player]:
+                return (holdings, current_player, move, 0), current_player
+            last_mask = move
+            passes = 0
+
+        current_player = (current_player - 1) % 4
+        if passes >= 3:
+            last_mask = 0
+            passes = 0
+        return (holdings, current_player, last_mask, passes), None
+
+    def _solve(self, position: Position) -> int:
+        self.lookups += 1
+        winner = self.table.get(position)
+        if winner is not None:
+            self.hits += 1
+            self.table.move_to_end(position)
+            return winner
+
+        self.nodes += 1
+        seat = position[1]
+        winner = None
+        for move in self.moves(position[0], seat, position[2]):
+            next_position, move_winner = self.child(position, move)
+            if move_winner is None:
+                move_winner = self._solve(next_position)
+            if winner is None:
+                winner = move_winner
+            if move_winner == seat:
+                winner = seat
+                break
+
+        self.table[position] = winner
+        if len(self.table) > self.max_entries:
+            self.table.popitem(last=False)
+            self.evictions += 1
+        return winner
+
+    def solve(self, holdings: Tuple[int, int, int, int], current_player: int, last_mask: int = 0, passes: int = 0) -> int:
+        start = time.perf_counter()
+        try:
+            return self._solve((tuple(holdings), current_player, last_mask, passes))
+        finally:
+            self.elapsed += time.perf_counter() - start
+
+    def move_results(self, holdings: Tuple[int, int, int, int], current_player: int, last_mask: int = 0,
+                     passes: int = 0) -> Dict[int, int]:
+        start = time.perf_counter()
+        position = (tuple(holdings), current_player, last_mask, passes)
+        results = {}
+        try:
+            for move in self.moves(position[0], current_player, last_mask):
+                next_position, winner = self.child(position, move)
+                results[move] = winner if winner is not None else self._solve(next_position)
+        finally:
+            self.elapsed += time.perf_counter() - start
+        return results
+
+    def best_move(self, holdings: Tuple[int, int, int, int], current_player: int, last_mask: int = 0, passes: int = 0) -> int:
+        results = self.move_results(holdings, current_player, last_mask, passes)
+        for move, winner in results.items():
+            if winner == current_player:
+                return move
+        return next(iter(results))
+
+class EndgamePolicy:
+    def __init__(self, fallback: Optional[Callable[[Game, Player], Optional[List[Card]]]] = None,
+                 threshold: int = 12, samples: int = 16, max_entries: int = 1_000_000, seed: Optional[int] = None):
+        self.fallback = fallback
+        self.threshold = threshold
+        self.samples = samples
+        self.solver = EndgameSolver(max_entries)
+        self.rng = random.Random(seed)
+
+    def close(self):
+        if self.fallback is not None and hasattr(self.fallback, "close"):
+            self.fallback.close()
+
+    def __call__(self, game: Game, player: Player) -> Optional[List[Card]]:
+        cards_left = sum(other.mask.bit_count() for other in game.players)
+        if cards_left > self.threshold:
+            if self.fallback is not None:
+                return self.fallback(game, player)
+            valid_moves = game.get_valid_moves(player)
+            return valid_moves[0] if valid_moves else None
+
+        moves = game.legal_moves()
+        if len(moves) <= 1:
+            return mask_to_cards(moves[0]) if moves and moves[0] != PASS else None
+
+        if self.solver.rules is not game.rules:
+            self.solver.rules = game.rules
+            self.solver.clear()
+        seat = game.current_player
+        observation = Observation(game, seat)
+        last_mask = game.last_hand.mask if game.last_hand else 0
+        wins = dict.fromkeys(moves, 0)
+        for _ in range(self.samples):
+            holdings = observation.determinize(self.rng).holdings
+            results = self.solver.move_results(tuple(holdings), seat, last_mask, game.passes)
+            for move, winner in results.items():
+                if winner == seat:
+                    wins[move] += 1
+
+        best = max(moves, key=lambda move: wins[move])
+        if best == PASS:
+            return None
+        return mask_to_cards(best)
@@ -0,0 +1,293 @@
+import random
+from typing import Callable, List, Tuple, Optional
+
+from cards import Suit, Card, HandType, INVALID_HAND, cards_to_mask, iter_indices, mask_to_cards
+from movegen import NUM_VALUES
+from rules import SIMPLE_RULES, RuleSet
+
+PASS = 0
+HAND_CACHE_LIMIT = 1 << 16
+
+GameState = Tuple[Tuple[int, int, int, int], int, int, Optional[int], int]
+
+DEAL_ORDER = tuple(Card(suit, value) for suit in Suit for value in range(3, 16))
+
+class Hand:
+    _by_mask = {}
+    
+    @classmethod
+    def from_mask(cls, mask: int, rules: RuleSet = SIMPLE_RULES) -> "Hand":
+        hands = cls._by_mask.get(rules)
+        if hands is None:
+            hands = cls._by_mask[rules] = {}
+        hand = hands.get(mask)
+        if hand is None:
+            if len(hands) >= HAND_CACHE_LIMIT:
+                del hands[next(iter(hands))]
+            hand = hands[mask] = cls(mask_to_cards(mask), rules)
+        return hand
+    
+    def __init__(self, cards: List[Card], rules: RuleSet = SIMPLE_RULES):
+        self.cards = sorted(cards)
+        self.mask = cards_to_mask(self.cards)
+        self.rules = rules
+        if self.mask.bit_count() == len(self.cards):
+            self.hand_type, self.rank = rules.lookup(self.mask)
+        else:
+            self.hand_type, self.rank = INVALID_HAND
+    
+    def can_beat(self, other_hand) -> bool:
+        if not other_hand:
+            return True
+        if self.hand_type is other_hand.hand_type and len(self.cards) == len(other_hand.cards):
+            return self.hand_type is not None and self.rank > other_hand.rank
+        if not self.rules.chops:
+            return False
+        return self.rules.beats(self.hand_type, self.rank, len(self.cards),
+                                other_hand.hand_type, other_hand.rank, len(other_hand.cards))
+
+class Player:
+    def __init__(self, name: str, is_human: bool = False, policy: Optional[Callable[["Game", "Player"], Optional[List[Card]]]] = None):
+        self.name = name
+        self.policy = policy
+        self.mask = 0
+        self.value_counts = [0] * NUM_VALUES
+        self.value_suits = [0] * NUM_VALUES
+        self.is_human = is_human
+        self.selected_cards = set()
+        self._cards = []
+    
+    @property
+    def cards(self) -> List[Card]:
+        if self._cards is None:
+            self._cards = mask_to_cards(self.mask)
+        return self._cards
+    
+    def add_card(self, card: Card):
+        self.add_cards([card])
+    
+    def add_cards(self, cards: List[Card]):
+        self.add_mask(cards_to_mask(cards))
+    
+    def add_mask(self, mask: int):
+        added = mask & ~self.mask
+        if not added:
+            return
+        self.mask |= added
+        for index in iter_indices(added):
+            value = index >> 2
+            self.value_counts[value] += 1
+            self.value_suits[value] |= 1 << (index & 3)
+        self._cards = None
+    
+    def remove_cards(self, cards: List[Card]):
+        if self.remove_mask(cards_to_mask(cards)):
+            self.selected_cards.difference_update(cards)
+    
+    def remove_mask(self, mask: int) -> int:
+        removed = self.mask & mask
+        if not removed:
+            return 0
+        self.mask ^= removed
+        for index in iter_indices(removed):
+            value = index >> 2
+            self.value_counts[value] -= 1
+            self.value_suits[value] &= ~(1 << (index & 3))
+        self._cards = None
+        return removed
+    
+    def set_mask(self, mask: int):
+        if mask != self.mask:
+            self.remove_mask(self.mask & ~mask)
+            self.add_mask(mask)
+    
+    def valid_move_masks(self, last_hand: Optional[Hand] = None, rules: RuleSet = SIMPLE_RULES) -> List[int]:
+        if last_hand is None:
+            return rules.generate(self.value_suits, self.value_counts)
+        if last_hand.hand_type is None:
+            return []
+        return rules.generate(self.value_suits, self.value_counts, last_hand.hand_type, last_hand.rank,
+                              last_hand.mask.bit_count())
+    
+    def opening_masks(self, rules: RuleSet = SIMPLE_RULES) -> List[int]:
+        return rules.opening_moves(self.value_suits, self.value_counts)
+    
+    def has_card(self, card: Card) -> bool:
+        return bool(self.mask & card.bit)
+    
+    def has_3_spades(self) -> bool:
+        return bool(self.mask & 1)
+
+class Game:
+    def __init__(self, rng: Optional[random.Random] = None, rules: Optional[RuleSet] = None):
+        self.players = [
+            Player("You", is_human=True),
+            Player("Player 1"),
+            Player("Player 2"), 
+            Player("Player 3")
+        ]
+        
+        self.current_player = 0
+        self.last_hand = None
+        self.last_player = None
+        self.game_started = False
+        self.winner = None
+        self.passes = 0
+        self.ai_played_time = 0
+        self.last_played_info = None
+        self.rng = rng if rng is not None else random
+        self.rules = rules if rules is not None else SIMPLE_RULES
+        self.recorder = None
+        self.tracker = None
+        self._history: List[GameState] = []
+        
+    def create_deck(self) -> List[Card]:
+        return list(DEAL_ORDER)
+    
+    def deal_cards(self, deck: Optional[List[Card]] = None):
+        if deck is None:
+            deck = self.create_deck()
+            self.rng.shuffle(deck)
+        
+        if self.recorder is not None:
+            self.recorder.start_game([card.index for card in deck])
+        
+        for i, player in enumerate(self.players):
+            player.add_cards(deck[i::4])
+        
+        for i, player in enumerate(self.players):
+            if player.has_3_spades():
+                self.current_player = i
+                break
+        
+        if self.tracker is not None:
+            self.tracker.reset(self)
+        
+        self.game_started = True
+    
+    def valid_masks(self, player: Player) -> List[int]:
+        if not self.last_hand and self.last_player is None:
+            return player.opening_masks(self.rules)
+        return player.valid_move_masks(self.last_hand, self.rules)
+    
+    def get_valid_moves(self, player: Player) -> List[List[Card]]:
+        return [mask_to_cards(mask) for mask in self.valid_masks(player)]
+    
+    def legal_moves(self) -> List[int]:
+        player = self.players[self.current_player]
+        if not self.last_hand:
+            if self.last_player is None:
+                return player.opening_masks(self.rules)
+            return player.valid_move_masks(None, self.rules)
+        moves = player.valid_move_masks(self.last_hand, self.rules)
+        moves.append(PASS)
+        return moves
+    
+    def ai_play(self, player: Player):
+        if player.policy is not None:
+            chosen_move = player.policy(self, player)
+        else:
+            valid_moves = self.valid_masks(player)
+            chosen_move = mask_to_cards(valid_moves[0]) if valid_moves else None
+        
+        if not chosen_move:
+            self.pass_turn()
+            return
+        
+        self.play_cards(player, chosen_move)
+    
+    def pass_turn(self):
+        if self.recorder is not None:
+            self.recorder.record(self.current_player, 0)
+        if self.tracker is not None:
+            self.tracker.on_pass(self.current_player, self.last_hand)
+        self.passes += 1
+        self.next_turn()
+    
+    def snapshot(self) -> GameState:
+        return (
+            tuple(player.mask for player in self.players),
+            self.current_player,
+            self.last_hand.mask if self.last_hand else 0,
+            self.last_player,
+            self.passes,
+        )
+    
+    def restore(self, state: GameState):
+        masks, self.current_player, last_mask, self.last_player, self.passes = state
+        for player, mask in zip(self.players, masks):
+            player.set_mask(mask)
+        
+        if last_mask:
+            self.last_hand = Hand.from_mask(last_mask, self.rules)
+            self.last_played_info = (self.players[self.last_player].name, self.last_hand.cards)
+        else:
+            self.last_hand = None
+            self.last_played_info = None
+        
+        self.winner = None
+        if self.game_started:
+            for player in self.players:
+                if not player.mask:
+                    self.winner = player
+                    break
+    
+    def apply(self, move: int):
+        self._history.append(self.snapshot())
+        
+        if not move:
+            self.passes += 1
+            self.next_turn()
+            return
+        
+        player = self.players[self.current_player]
+        player.remove_mask(move)
+        self.last_hand = Hand.from_mask(move, self.rules)
+        self.last_player = self.current_player
+        self.last_played_info = (player.name, self.last_hand.cards)
+        self.passes = 0
+        
+        if not player.mask:
+            self.winner = player
+            return
+        
+        self.next_turn()
+    
+    def undo(self):
+        self.restore(self._history.pop())
+    
+    def play_cards(self, player: Player, cards: List[Card]):
+        hand = Hand(cards, self.rules)
+        if hand.hand_type is None:
+            return
+        
+        if not self.last_hand or hand.can_beat(self.last_hand):
+            if self.recorder is not None:
+                self.recorder.record(self.current_player, hand.mask)
+            if self.tracker is not None:
+                self.tracker.on_play(self.current_player, hand.mask)
+            
+            player.remove_cards(cards)
+            self.last_hand = hand
+            self.last_player = self.current_player
+            self.last_played_info = (player.name, cards)
+            self.passes = 0
+            
+            if len(player.cards) == 0:
+                self.winner = player
+                if self.recorder is not None:
+                    self.recorder.end_game(self.current_player)
+                return
+            
+            self.next_turn()
+    
+    def next_turn(self):
+        self.current_player = (self.current_player - 1) % 4
+        
+        if self.passes >= 3:
+            self.last_hand = None
+            self.last_played_info = None
+            self.passes = 0
+    
+    def is_current_player_human(self):
+        return self.players[self.current_player].is_human
@@ -0,0 +1,197 @@
+import argparse
+import mmap
+import os
+import struct
+from array import array
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from cards import DECK, NUM_CARDS, mask_to_cards
+from engine import Game
+from rules import RULES, SIMPLE_RULES, RuleSet, get_rules
+
+MAGIC = b"TLG2"
+OLD_MAGIC = b"TLG1"
+NAME_LENGTH = struct.Struct("<B")
+GAME_HEADER = struct.Struct("<HB")
+ACTION = struct.Struct("<Q")
+SEAT_SHIFT = 56
+CARD_BITS = (1 << NUM_CARDS) - 1
+NO_WINNER = 0xFF
+
+class GameRecord:
+    def __init__(self, deal: bytes, actions: List[Tuple[int, int]], winner: Optional[int]):
+        self.deal = deal
+        self.actions = actions
+        self.winner = winner
+
+def file_header(rules: RuleSet) -> bytes:
+    name = rules.name.encode()
+    return MAGIC + NAME_LENGTH.pack(len(name)) + name
+
+def read_header(data, path: str) -> Tuple[RuleSet, int]:
+    if data[:len(OLD_MAGIC)] == OLD_MAGIC:
+        return SIMPLE_RULES, len(OLD_MAGIC)
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a game log")
+    (length,) = NAME_LENGTH.unpack_from(data, len(MAGIC))
+    start = len(MAGIC) + NAME_LENGTH.size
+    name = bytes(data[start:start + length]).decode()
+    if name not in RULES:
+        raise ValueError(f"{path} was played under unknown rules {name!r}")
+    return get_rules(name), start + length
+
+class GameLogWriter:
+    def __init__(self, path: str, buffer_size: int = 1 << 20, rules: RuleSet = SIMPLE_RULES):
+        self.path = path
+        self.rules = rules
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        if not new_file:
+            with open(path, "rb") as f:
+                existing, _ = read_header(f.read(len(MAGIC) + NAME_LENGTH.size + 255), path)
+            if existing is not rules:
+                raise ValueError(f"{path} was played under {existing.name} rules, not {rules.name}")
+        self.file: BinaryIO = open(path, "ab", buffering=buffer_size)
+        if new_file:
+            self.file.write(file_header(rules))
+        self.index_file: BinaryIO = open(path + ".idx", "ab")
+        self.offset = self.file.tell()
+        self.games = 0
+        self._deal = None
+        self._actions = array("Q")
+
+    def start_game(self, deal: List[int]):
+        self._deal = bytes(deal)
+        self._actions = array("Q")
+
+    def record(self, seat: int, mask: int):
+        self._actions.append(seat << SEAT_SHIFT | mask)
+
+    def end_game(self, winner: Optional[int]):
+        if self._deal is None:
+            return
+        header = GAME_HEADER.pack(len(self._actions), NO_WINNER if winner is None else winner)
+        body = struct.pack(f"<{len(self._actions)}Q", *self._actions)
+        self.file.write(header)
+        self.file.write(self._deal)
+        self.file.write(body)
+        self.index_file.write(struct.pack("<Q", self.offset))
+        self.offset += len(header) + NUM_CARDS + len(body)
+        self.games += 1
+        self._deal = None
+
+    def close(self):
+        self.file.close()
+        self.index_file.close()
+
+    def __enter__(self) -> "GameLogWriter":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class GameLogReader:
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.rules, self.start = read_header(self.data, path)
+        self.offsets = self._load_index()
+
+    def _load_index(self) -> array:
+        offsets = array("Q")
+        index_path = self.path + ".idx"
+        if os.path.exists(index_path):
+            with open(index_path, "rb") as f:
+                offsets.frombytes(f.read())
+            if self._game_end(offsets[-1] if offsets else None) == len(self.data):
+                return offsets
+            offsets = array("Q")
+
+        offset = self.start
+        while offset < len(self.data):
+            offsets.append(offset)
+            offset = self._game_end(offset)
+        return offsets
+
+    def _game_end(self, offset: Optional[int]) -> int:
+        if offset is None:
+            return self.start
+        count, _ = GAME_HEADER.unpack_from(self.data, offset)
+        return offset + GAME_HEADER.size + NUM_CARDS + count * ACTION.size
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, n: int) -> GameRecord:
+        offset = self.offsets[n]
+        count, winner = GAME_HEADER.unpack_from(self.data, offset)
+        offset += GAME_HEADER.size
+        deal = self.data[offset:offset + NUM_CARDS]
+        offset += NUM_CARDS
+        actions = [(packed >> SEAT_SHIFT, packed & CARD_BITS)
+                   for packed in struct.unpack_from(f"<{count}Q", self.data, offset)]
+        return GameRecord(deal, actions, None if winner == NO_WINNER else winner)
+
+    def __iter__(self) -> Iterator[GameRecord]:
+        for n in range(len(self)):
+            yield self[n]
+
+    def replay(self, n: int, rules: Optional[RuleSet] = None) -> Game:
+        record = self[n]
+        game = Game(rules=rules or self.rules)
+        for player in game.players:
+            player.is_human = False
+        game.deal_cards([DECK[index] for index in record.deal])
+
+        for turn, (seat, mask) in enumerate(record.actions):
+            if game.winner:
+                raise ValueError(f"game {n}: action {turn} after the game ended")
+            if seat != game.current_player:
+                raise ValueError(f"game {n}: action {turn} by seat {seat}, expected seat {game.current_player}")
+            if not mask:
+                game.pass_turn()
+                continue
+            player = game.players[seat]
+            if player.mask & mask != mask:
+                raise ValueError(f"game {n}: seat {seat} does not hold the cards of action {turn}")
+            if game.rules.lookup(mask)[0] is None:
+                raise ValueError(f"game {n}: action {turn} is not a valid combination")
+            game.play_cards(player, mask_to_cards(mask))
+            if player.mask & mask:
+                raise ValueError(f"game {n}: action {turn} does not beat the last hand")
+
+        winner = game.players.index(game.winner) if game.winner else None
+        if winner != record.winner:
+            raise ValueError(f"game {n}: replay winner {winner} does not match recorded winner {record.winner}")
+        return game
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self) -> "GameLogReader":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Inspect and verify a binary game log")
+    parser.add_argument("path")
+    parser.add_argument("--verify", action="store_true", help="replay every game through Game")
+    parser.add_argument("--rules", choices=sorted(RULES), help="replay under these rules instead of the ones in the log header")
+    args = parser.parse_args(argv)
+
+    with GameLogReader(args.path) as reader:
+        actions = sum(len(record.actions) for record in reader)
+        print(f"rules: {reader.rules.name}")
+        print(f"games: {len(reader)}")
+        print(f"actions: {actions}")
+        print(f"bytes: {len(reader.data)}")
+        if args.verify:
+            for n in range(len(reader)):
+                reader.replay(n, RULES[args.rules] if args.rules else None)
+            print("verified: ok")
+
+if __name__ == "__main__":
+    main()
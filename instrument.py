@@ -0,0 +1,174 @@
+import csv
+import functools
+import json
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from engine import Game
+
+NUM_BUCKETS = 32
+
+enabled = False
+
+class Histogram:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * NUM_BUCKETS
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        micros = int(seconds * 1e6)
+        self.buckets[min(micros.bit_length(), NUM_BUCKETS - 1)] += 1
+
+    def percentile(self, fraction: float) -> float:
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            if count and seen + count >= target:
+                low = (1 << bucket) >> 1
+                high = 1 << bucket
+                micros = low + (high - low) * (target - seen) / count
+                return min(micros / 1e6, self.max)
+            seen += count
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1e3 if self.count else 0.0,
+            "p50_ms": self.percentile(0.5) * 1e3,
+            "p95_ms": self.percentile(0.95) * 1e3,
+            "max_ms": self.max * 1e3,
+            "total_s": self.total,
+        }
+
+counters: Dict[str, int] = {}
+histograms: Dict[str, Histogram] = {}
+_originals: Dict[str, Callable] = {}
+_lock = threading.Lock()
+
+def count(name: str, amount: int = 1):
+    counters[name] = counters.get(name, 0) + amount
+
+def record(name: str, seconds: float):
+    histogram = histograms.get(name)
+    if histogram is None:
+        histogram = histograms[name] = Histogram()
+    histogram.add(seconds)
+
+def reset():
+    counters.clear()
+    histograms.clear()
+
+def _timed(name: str, method: Callable) -> Callable:
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            record(name, time.perf_counter() - start)
+    return wrapper
+
+def _counted(name: str, method: Callable) -> Callable:
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        count(name)
+        return method(*args, **kwargs)
+    return wrapper
+
+def _counted_next_turn(method: Callable) -> Callable:
+    @functools.wraps(method)
+    def wrapper(game: Game):
+        if game.passes >= 3:
+            count("next_turn.resets")
+        count("next_turn")
+        return method(game)
+    return wrapper
+
+def enable():
+    global enabled
+    if enabled:
+        return
+    for name in ("valid_masks", "play_cards", "ai_play", "pass_turn", "next_turn"):
+        _originals[name] = getattr(Game, name)
+    Game.valid_masks = _timed("get_valid_moves", _originals["valid_masks"])
+    Game.play_cards = _timed("play_cards", _originals["play_cards"])
+    Game.ai_play = _timed("ai_play", _originals["ai_play"])
+    Game.pass_turn = _counted("pass_turn", _originals["pass_turn"])
+    Game.next_turn = _counted_next_turn(_originals["next_turn"])
+    enabled = True
+
+def disable():
+    global enabled
+    for name, method in _originals.items():
+        setattr(Game, name, method)
+    _originals.clear()
+    enabled = False
+
+def snapshot() -> Dict:
+    return {
+        "time": time.time(),
+        "counters": dict(counters),
+        "histograms": {name: histogram.summary() for name, histogram in list(histograms.items())},
+    }
+
+def write_json(path: str):
+    with open(path, "w") as f:
+        json.dump(snapshot(), f, indent=2)
+
+def write_csv(path: str):
+    data = snapshot()
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["metric", "count", "mean_ms", "p50_ms", "p95_ms", "max_ms", "total_s"])
+        for name, value in data["counters"].items():
+            writer.writerow([name, value, "", "", "", "", ""])
+        for name, summary in data["histograms"].items():
+            writer.writerow([name, summary["count"], summary["mean_ms"], summary["p50_ms"],
+                             summary["p95_ms"], summary["max_ms"], summary["total_s"]])
+
+def export(path: str):
+    with _lock:
+        if path.endswith(".csv"):
+            write_csv(path)
+        else:
+            write_json(path)
+
+def overlay_lines() -> List[str]:
+    lines = []
+    for name, histogram in sorted(list(histograms.items())):
+        summary = histogram.summary()
+        lines.append(f"{name}: n={summary['count']} avg={summary['mean_ms']:.2f}ms p95={summary['p95_ms']:.2f}ms")
+    for name, value in sorted(list(counters.items())):
+        lines.append(f"{name}: {value}")
+    return lines
+
+class PeriodicExporter:
+    def __init__(self, path: str, interval: float = 10.0):
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            export(self.path)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        export(self.path)
@@ -0,0 +1,208 @@
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from belief import sample_holdings
+from cards import cards_to_mask, mask_to_cards
+from engine import PASS, Card, Game, Player
+from rules import SIMPLE_RULES, RuleSet
+
+class SearchState:
+    __slots__ = ("holdings", "current_player", "last_mask", "last_type", "last_rank", "passes", "winner", "rules",
+                 "opening")
+
+    def __init__(self, holdings: List[int], current_player: int, last_mask: int, passes: int,
+                 rules: RuleSet = SIMPLE_RULES, opening: bool = False):
+        self.holdings = holdings
+        self.current_player = current_player
+        self.last_mask = last_mask
+        self.rules = rules
+        self.last_type, self.last_rank = rules.lookup(last_mask) if last_mask else (None, -1)
+        self.passes = passes
+        self.winner = None
+        self.opening = opening
+
+    def legal_moves(self) -> List[int]:
+        holding = self.holdings[self.current_player]
+        if not self.last_mask:
+            if self.opening:
+                return self.rules.openings_from_mask(holding)
+            return self.rules.generate_from_mask(holding)
+        moves = self.rules.generate_from_mask(holding, self.last_type, self.last_rank, self.last_mask.bit_count())
+        moves.append(PASS)
+        return moves
+
+    def play(self, move: int):
+        seat = self.current_player
+        if move == PASS:
+            self.passes += 1
+        else:
+            self.holdings[seat] ^= move
+            self.last_mask = move
+            self.last_type, self.last_rank = self.rules.lookup(move)
+            self.passes = 0
+            self.opening = False
+            if not self.holdings[seat]:
+                self.winner = seat
+                return
+
+        self.current_player = (seat - 1) % 4
+        if self.passes >= 3:
+            self.last_mask = 0
+            self.last_type, self.last_rank = None, -1
+            self.passes = 0
+
+class Observation:
+    def __init__(self, game: Game, seat: int):
+        self.seat = seat
+        self.own = game.players[seat].mask
+        self.counts = [player.mask.bit_count() for player in game.players]
+        in_hands = 0
+        for player in game.players:
+            in_hands |= player.mask
+        self.unseen = in_hands & ~self.own
+        self.current_player = game.current_player
+        self.last_mask = game.last_hand.mask if game.last_hand else 0
+        self.passes = game.passes
+        self.constraints = game.tracker.constraints(seat) if game.tracker is not None else None
+        self.rules = game.rules
+        self.opening = not game.last_hand and game.last_player is None
+
+    def determinize(self, rng: random.Random) -> SearchState:
+        holdings = sample_holdings(rng, self.seat, self.own, self.unseen, self.counts, self.constraints)
+        return SearchState(holdings, self.current_player, self.last_mask, self.passes, self.rules, self.opening)
+
+class Node:
+    __slots__ = ("move", "seat", "parent", "children", "visits", "wins", "avails")
+
+    def __init__(self, move: int = PASS, seat: int = -1, parent: Optional["Node"] = None):
+        self.move = move
+        self.seat = seat
+        self.parent = parent
+        self.children: Dict[int, "Node"] = {}
+        self.visits = 0
+        self.wins = 0
+        self.avails = 1
+
+    def select(self, moves: List[int], exploration: float) -> "Node":
+        best = None
+        best_score = -1.0
+        for move in moves:
+            child = self.children[move]
+            child.avails += 1
+            score = child.wins / child.visits + exploration * math.sqrt(math.log(child.avails) / child.visits)
+            if score > best_score:
+                best = child
+                best_score = score
+        return best
+
+def rollout(state: SearchState, rng: random.Random):
+    while state.winner is None:
+        moves = state.legal_moves()
+        state.play(moves[rng.randrange(len(moves))])
+
+def search(observation: Observation, seed: int, time_limit: Optional[float], playouts: Optional[int],
+           exploration: float = 0.7) -> Tuple[Dict[int, Tuple[int, int]], int]:
+    rng = random.Random(seed)
+    root = Node()
+    deadline = time.perf_counter() + time_limit if time_limit else None
+    done = 0
+
+    while (playouts is None or done < playouts) and (deadline is None or time.perf_counter() < deadline):
+        state = observation.determinize(rng)
+        node = root
+
+        while state.winner is None:
+            moves = state.legal_moves()
+            untried = [move for move in moves if move not in node.children]
+            if untried:
+                move = untried[rng.randrange(len(untried))]
+                child = Node(move, state.current_player, node)
+                node.children[move] = child
+                for other in moves:
+                    if other != move and other in node.children:
+                        node.children[other].avails += 1
+                state.play(move)
+                node = child
+                break
+            node = node.select(moves, exploration)
+            state.play(node.move)
+
+        rollout(state, rng)
+
+        while node is not None:
+            node.visits += 1
+            if node.seat == state.winner:
+                node.wins += 1
+            node = node.parent
+        done += 1
+
+    return {move: (child.visits, child.wins) for move, child in root.children.items()}, done
+
+def _search_worker(args) -> Tuple[Dict[int, Tuple[int, int]], int]:
+    return search(*args)
+
+class ISMCTSPolicy:
+    def __init__(self, time_limit: Optional[float] = 1.0, playouts: Optional[int] = None, workers: int = 1,
+                 exploration: float = 0.7, seed: Optional[int] = None):
+        if time_limit is None and playouts is None:
+            raise ValueError("ISMCTSPolicy needs a time_limit or a playouts budget")
+        self.time_limit = time_limit
+        self.playouts = playouts
+        self.workers = workers
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        self.executor = None
+        self.last_playouts = 0
+        self.last_elapsed = 0.0
+        self.total_playouts = 0
+        self.total_elapsed = 0.0
+
+    def playouts_per_second(self) -> float:
+        return self.total_playouts / self.total_elapsed if self.total_elapsed else 0.0
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __call__(self, game: Game, player: Player) -> Optional[List[Card]]:
+        valid_moves = game.get_valid_moves(player)
+        if not valid_moves:
+            return None
+        if len(valid_moves) == 1 and not game.last_hand:
+            return valid_moves[0]
+
+        seat = game.players.index(player)
+        observation = Observation(game, seat)
+        start = time.perf_counter()
+
+        if self.workers <= 1:
+            stats, done = search(observation, self.rng.getrandbits(64), self.time_limit, self.playouts, self.exploration)
+            results = [(stats, done)]
+        else:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(self.workers)
+            share = -(-self.playouts // self.workers) if self.playouts is not None else None
+            jobs = [(observation, self.rng.getrandbits(64), self.time_limit, share, self.exploration)
+                    for _ in range(self.workers)]
+            results = list(self.executor.map(_search_worker, jobs))
+
+        visits: Dict[int, int] = {}
+        done = 0
+        for stats, count in results:
+            done += count
+            for move, (move_visits, _) in stats.items():
+                visits[move] = visits.get(move, 0) + move_visits
+
+        self.last_playouts = done
+        self.last_elapsed = time.perf_counter() - start
+        self.total_playouts += done
+        self.total_elapsed += self.last_elapsed
+
+        best = max(visits, key=visits.get) if visits else cards_to_mask(valid_moves[0])
+        if best == PASS:
+            return None
+        return mask_to_cards(best)
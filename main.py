@@ -1,15 +1,35 @@
+import argparse
+import os
 import pygame
-import random
 import sys
-from enum import Enum
+import time
 from typing import List, Tuple, Optional
 
-pygame.init()
+from ai import create_ai_policy
+from belief import BeliefTracker
+from cards import DECK, cards_to_mask
+from engine import Suit, Card, HandType, Player, Game
+from rules import RULES, RuleSet
+import instrument
 
 SCREEN_WIDTH = 1200
 SCREEN_HEIGHT = 800
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Tien Len Mien Nam - Vietnamese Poker")
+CARD_WIDTH = 50
+CARD_HEIGHT = 70
+AI_DELAY_MS = 5000
+AI_TURN = pygame.USEREVENT + 1
+OVERLAY_REFRESH = pygame.USEREVENT + 2
+OVERLAY_RECT = pygame.Rect(850, 560, 345, 235)
+PLAYED_RECT = pygame.Rect(400, 335, 600, 100)
+PLAYED_PITCH = 60
+MAX_SPEED = 1000.0
+
+PLAYER_POSITIONS = [
+    (300, 680, True),
+    (50, 200, False),
+    (300, 50, True),
+    (1050, 200, False)
+]
 
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -21,257 +41,70 @@ GRAY = (128, 128, 128)
 LIGHT_GRAY = (211, 211, 211)
 DARK_GREEN = (0, 100, 0)
 
-font_small = pygame.font.SysFont('arial', 20)
-font_medium = pygame.font.SysFont('arial', 28)
-font_large = pygame.font.SysFont('arial', 40)
-
-class Suit(Enum):
-    SPADES = 0
-    CLUBS = 1
-    DIAMONDS = 2
-    HEARTS = 3
-
-class Card:
-    def __init__(self, suit: Suit, value: int):
-        self.suit = suit
-        self.value = value
-        
-    def get_display_value(self):
-        if self.value <= 10:
-            return str(self.value)
-        elif self.value == 11:
-            return "J"
-        elif self.value == 12:
-            return "Q"
-        elif self.value == 13:
-            return "K"
-        elif self.value == 14:
-            return "A"
-        elif self.value == 15:
-            return "2"
-    
-    def get_suit_symbol(self):
-        symbols = {Suit.SPADES: "♠", Suit.CLUBS: "♣", Suit.DIAMONDS: "♦", Suit.HEARTS: "♥"}
-        return symbols[self.suit]
-    
-    def get_sort_value(self):
-        if self.value == 3 and self.suit == Suit.SPADES:
-            return 0
-        elif self.value == 3:
-            return self.value * 10 + self.suit.value
-        else:
-            return self.value * 10 + self.suit.value
-    
-    def __lt__(self, other):
-        return self.get_sort_value() < other.get_sort_value()
-    
-    def __eq__(self, other):
-        return self.suit == other.suit and self.value == other.value
-
-class HandType(Enum):
-    SINGLE = 1
-    PAIR = 2
-    TRIPLE = 3
-    QUAD = 4
-    STRAIGHT = 5
-
-class Hand:
-    def __init__(self, cards: List[Card]):
-        self.cards = sorted(cards)
-        self.hand_type = self._determine_type()
-        self.rank = self._get_rank()
-    
-    def _determine_type(self) -> HandType:
-        if len(self.cards) == 1:
-            return HandType.SINGLE
-        elif len(self.cards) == 2 and self.cards[0].value == self.cards[1].value:
-            return HandType.PAIR
-        elif len(self.cards) == 3 and all(c.value == self.cards[0].value for c in self.cards):
-            return HandType.TRIPLE
-        elif len(self.cards) == 4 and all(c.value == self.cards[0].value for c in self.cards):
-            return HandType.QUAD
-        elif len(self.cards) == 5 and self._is_straight():
-            return HandType.STRAIGHT
-        else:
-            return None
-    
-    def _is_straight(self) -> bool:
-        if len(self.cards) != 5:
-            return False
-        values = [c.value for c in self.cards]
-        values.sort()
-        for i in range(1, 5):
-            if values[i] != values[i-1] + 1:
-                return False
-        return True
-    
-    def _get_rank(self) -> int:
-        if self.hand_type == HandType.SINGLE:
-            return self.cards[0].get_sort_value()
-        elif self.hand_type == HandType.PAIR:
-            return self.cards[0].value * 100 + max(c.suit.value for c in self.cards)
-        elif self.hand_type == HandType.TRIPLE:
-            return self.cards[0].value * 1000
-        elif self.hand_type == HandType.QUAD:
-            return self.cards[0].value * 10000
-        elif self.hand_type == HandType.STRAIGHT:
-            return max(c.value for c in self.cards) * 100
-        return 0
-    
-    def can_beat(self, other_hand) -> bool:
-        if not other_hand:
-            return True
-        if self.hand_type != other_hand.hand_type:
-            return False
-        if len(self.cards) != len(other_hand.cards):
-            return False
-        return self.rank > other_hand.rank
-
-class Player:
-    def __init__(self, name: str, is_human: bool = False):
-        self.name = name
-        self.cards = []
-        self.is_human = is_human
-        self.selected_cards = []
-    
-    def add_card(self, card: Card):
-        self.cards.append(card)
-        self.cards.sort()
-    
-    def remove_cards(self, cards: List[Card]):
-        for card in cards:
-            if card in self.cards:
-                self.cards.remove(card)
-    
-    def has_3_spades(self) -> bool:
-        return any(card.value == 3 and card.suit == Suit.SPADES for card in self.cards)
+screen = None
+font_small = None
+font_medium = None
+font_large = None
+font_overlay = None
+render_cache = None
 
-class Game:
+class RenderCache:
     def __init__(self):
-        self.players = [
-            Player("You", is_human=True),
-            Player("Player 1"),
-            Player("Player 2"), 
-            Player("Player 3")
-        ]
-        
-        self.current_player = 0
-        self.last_hand = None
-        self.last_player = None
-        self.game_started = False
-        self.winner = None
-        self.passes = 0
-        self.ai_played_time = 0
-        self.last_played_info = None
-        
-    def create_deck(self) -> List[Card]:
-        deck = []
-        for suit in Suit:
-            for value in range(3, 16):
-                deck.append(Card(suit, value))
-        return deck
-    
-    def deal_cards(self):
-        deck = self.create_deck()
-        random.shuffle(deck)
-        
-        for i, card in enumerate(deck):
-            self.players[i % 4].add_card(card)
-        
-        for i, player in enumerate(self.players):
-            if player.has_3_spades():
-                self.current_player = i
-                break
-        
-        self.game_started = True
-    
-    def get_valid_moves(self, player: Player) -> List[List[Card]]:
-        if not self.last_hand:
-            valid_moves = []
-            for card in player.cards:
-                if card.value == 3 and card.suit == Suit.SPADES:
-                    valid_moves.append([card])
-            return valid_moves
-        
-        valid_moves = []
-        cards = player.cards
-        
-        if self.last_hand.hand_type == HandType.SINGLE:
-            for card in cards:
-                hand = Hand([card])
-                if hand.can_beat(self.last_hand):
-                    valid_moves.append([card])
-        
-        elif self.last_hand.hand_type == HandType.PAIR:
-            for i in range(len(cards)-1):
-                if cards[i].value == cards[i+1].value:
-                    hand = Hand([cards[i], cards[i+1]])
-                    if hand.can_beat(self.last_hand):
-                        valid_moves.append([cards[i], cards[i+1]])
-        
-        elif self.last_hand.hand_type == HandType.TRIPLE:
-            for i in range(len(cards)-2):
-                if (cards[i].value == cards[i+1].value == cards[i+2].value):
-                    hand = Hand([cards[i], cards[i+1], cards[i+2]])
-                    if hand.can_beat(self.last_hand):
-                        valid_moves.append([cards[i], cards[i+1], cards[i+2]])
-        
-        elif self.last_hand.hand_type == HandType.QUAD:
-            for i in range(len(cards)-3):
-                if (cards[i].value == cards[i+1].value == cards[i+2].value == cards[i+3].value):
-                    hand = Hand([cards[i], cards[i+1], cards[i+2], cards[i+3]])
-                    if hand.can_beat(self.last_hand):
-                        valid_moves.append([cards[i], cards[i+1], cards[i+2], cards[i+3]])
-        
-        elif self.last_hand.hand_type == HandType.STRAIGHT:
-            for i in range(len(cards)-4):
-                straight_cards = cards[i:i+5]
-                if len(set(c.value for c in straight_cards)) == 5:
-                    values = sorted([c.value for c in straight_cards])
-                    if all(values[j] == values[j-1] + 1 for j in range(1, 5)):
-                        hand = Hand(straight_cards)
-                        if hand.can_beat(self.last_hand):
-                            valid_moves.append(straight_cards)
-        
-        return valid_moves
-    
-    def ai_play(self, player: Player):
-        valid_moves = self.get_valid_moves(player)
+        self.atlas = None
+        self.labels = {}
+    
+    def build_atlas(self, path: Optional[str] = None):
+        size = ((len(DECK) + 1) * CARD_WIDTH, 2 * CARD_HEIGHT)
+        if path and os.path.exists(path):
+            atlas = pygame.image.load(path)
+            if atlas.get_size() == size:
+                self.atlas = atlas.convert()
+                return
         
-        if not valid_moves:
-            self.passes += 1
-            self.next_turn()
-            return
+        atlas = pygame.Surface(size)
+        for card in DECK:
+            draw_card(atlas, card, card.index * CARD_WIDTH, 0, CARD_WIDTH, CARD_HEIGHT)
+            draw_card(atlas, card, card.index * CARD_WIDTH, CARD_HEIGHT, CARD_WIDTH, CARD_HEIGHT, selected=True)
+        draw_card_back(atlas, len(DECK) * CARD_WIDTH, 0, CARD_WIDTH, CARD_HEIGHT)
         
-        chosen_move = valid_moves[0]
-        self.play_cards(player, chosen_move)
+        if path:
+            pygame.image.save(atlas, path)
+        self.atlas = atlas.convert()
+    
+    def blit_card(self, surface, card: Card, x: int, y: int, selected: bool = False):
+        area = (card.index * CARD_WIDTH, CARD_HEIGHT if selected else 0, CARD_WIDTH, CARD_HEIGHT)
+        surface.blit(self.atlas, (x, y), area)
+    
+    def blit_back(self, surface, x: int, y: int):
+        surface.blit(self.atlas, (x, y), (len(DECK) * CARD_WIDTH, 0, CARD_WIDTH, CARD_HEIGHT))
+    
+    def label(self, slot, font, text: str, color) -> "pygame.Surface":
+        entry = self.labels.get(slot)
+        if entry is None or entry[0] != text or entry[1] != color or entry[2] is not font:
+            entry = (text, color, font, font.render(text, True, color))
+            self.labels[slot] = entry
+        return entry[3]
+
+def init_display(atlas_path: Optional[str] = None):
+    global screen, font_small, font_medium, font_large, font_overlay, render_cache
     
-    def play_cards(self, player: Player, cards: List[Card]):
-        hand = Hand(cards)
-        
-        if not self.last_hand or hand.can_beat(self.last_hand):
-            player.remove_cards(cards)
-            self.last_hand = hand
-            self.last_player = self.current_player
-            self.last_played_info = (player.name, cards)
-            self.passes = 0
-            
-            if len(player.cards) == 0:
-                self.winner = player
-                return
-            
-            self.next_turn()
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Tien Len Mien Nam - Vietnamese Poker")
     
-    def next_turn(self):
-        self.current_player = (self.current_player - 1) % 4
-        
-        if self.passes >= 3:
-            self.last_hand = None
-            self.last_played_info = None
-            self.passes = 0
+    font_small = pygame.font.SysFont('arial', 20)
+    font_medium = pygame.font.SysFont('arial', 28)
+    font_large = pygame.font.SysFont('arial', 40)
+    font_overlay = pygame.font.SysFont('arial', 14)
     
-    def is_current_player_human(self):
-        return self.players[self.current_player].is_human
+    cache = RenderCache()
+    cache.build_atlas(atlas_path)
+    render_cache = cache
+
+def render_label(slot, font, text: str, color) -> "pygame.Surface":
+    if render_cache is None:
+        return font.render(text, True, color)
+    return render_cache.label(slot, font, text, color)
 
 def draw_card_back(surface, x: int, y: int, width: int, height: int):
     pygame.draw.rect(surface, BLUE, (x, y, width, height))
@@ -284,6 +117,13 @@ def draw_card_back(surface, x: int, y: int, width: int, height: int):
             pygame.draw.circle(surface, WHITE, (dot_x, dot_y), 2)
 
 def draw_card(surface, card: Card, x: int, y: int, width: int, height: int, selected: bool = False, face_up: bool = True):
+    if render_cache is not None and width == CARD_WIDTH and height == CARD_HEIGHT:
+        if face_up:
+            render_cache.blit_card(surface, card, x, y, selected)
+        else:
+            render_cache.blit_back(surface, x, y)
+        return
+    
     if not face_up:
         draw_card_back(surface, x, y, width, height)
         return
@@ -320,14 +160,13 @@ def draw_player_cards(surface, player: Player, x: int, y: int, clickable: bool =
             draw_card(surface, card, card_x, card_y, card_width, card_height, selected, show_cards)
     
     name_color = YELLOW if clickable else WHITE
-    name_text = font_small.render(player.name, True, name_color)
+    name_text = render_label(("name", x, y), font_small, player.name, name_color)
+    count_text = render_label(("count", x, y), font_small, f"Cards: {len(player.cards)}", WHITE)
     if horizontal:
         surface.blit(name_text, (x, y - 25))
-        count_text = font_small.render(f"Cards: {len(player.cards)}", True, WHITE)
         surface.blit(count_text, (x, y + card_height + 3))
     else:
         surface.blit(name_text, (x + card_width + 5, y))
-        count_text = font_small.render(f"Cards: {len(player.cards)}", True, WHITE)
         surface.blit(count_text, (x + card_width + 5, y + 20))
 
 def handle_card_click(player: Player, mouse_pos: Tuple[int, int], cards_x: int, cards_y: int, horizontal: bool = True):
@@ -347,13 +186,17 @@ def handle_card_click(player: Player, mouse_pos: Tuple[int, int], cards_x: int,
             card_y <= mouse_pos[1] <= card_y + card_height):
             
             if card in player.selected_cards:
-                player.selected_cards.remove(card)
+                player.selected_cards.discard(card)
             else:
-                player.selected_cards.append(card)
+                player.selected_cards.add(card)
             break
 
-def get_card_description(cards: List[Card]) -> str:
-    if len(cards) == 1:
+def get_card_description(cards: List[Card], hand_type: Optional[HandType] = None) -> str:
+    if hand_type == HandType.PAIR_SEQUENCE:
+        return f"{len(cards) // 2} pairs {cards[0].get_display_value()}-{cards[-1].get_display_value()}"
+    elif hand_type == HandType.STRAIGHT:
+        return f"straight {cards[0].get_display_value()}-{cards[-1].get_display_value()}"
+    elif len(cards) == 1:
         card = cards[0]
         suit_names = {
             Suit.SPADES: "spades", Suit.CLUBS: "clubs", 
@@ -374,11 +217,11 @@ def get_card_description(cards: List[Card]) -> str:
 def draw_start_screen(surface):
     surface.fill(DARK_GREEN)
     
-    title_text = font_large.render("TIEN LEN - VIETNAMESE POKER", True, YELLOW)
+    title_text = render_label("title", font_large, "TIEN LEN - VIETNAMESE POKER", YELLOW)
     title_rect = title_text.get_rect(center=(SCREEN_WIDTH//2, 200))
     surface.blit(title_text, title_rect)
     
-    subtitle_text = font_medium.render("Click to start game:", True, WHITE)
+    subtitle_text = render_label("subtitle", font_medium, "Click to start game:", WHITE)
     subtitle_rect = subtitle_text.get_rect(center=(SCREEN_WIDTH//2, 300))
     surface.blit(subtitle_text, subtitle_rect)
     
@@ -392,156 +235,435 @@ def draw_start_screen(surface):
     pygame.draw.rect(surface, LIGHT_GRAY, start_button)
     pygame.draw.rect(surface, BLACK, start_button, 2)
     
-    button_text = font_medium.render("Start Game", True, BLACK)
+    button_text = render_label("start", font_medium, "Start Game", BLACK)
     text_rect = button_text.get_rect(center=start_button.center)
     surface.blit(button_text, text_rect)
     
     return start_button
 
-def main():
-    clock = pygame.time.Clock()
-    game = None
-    start_mode = True
+def draw_table(surface, game: Game, show_all: bool = False, status: Optional[str] = None):
+    surface.fill(GREEN)
+    
+    play_button = pygame.Rect(50, 550, 80, 40)
+    pass_button = pygame.Rect(140, 550, 80, 40)
+    restart_button = pygame.Rect(230, 550, 80, 40)
+    
+    pygame.draw.rect(surface, LIGHT_GRAY, play_button)
+    pygame.draw.rect(surface, LIGHT_GRAY, pass_button) 
+    pygame.draw.rect(surface, LIGHT_GRAY, restart_button)
+    pygame.draw.rect(surface, BLACK, play_button, 2)
+    pygame.draw.rect(surface, BLACK, pass_button, 2)
+    pygame.draw.rect(surface, BLACK, restart_button, 2)
+    
+    play_text = render_label("play", font_medium, "Play", BLACK)
+    pass_text = render_label("pass", font_medium, "Pass", BLACK)
+    restart_text = render_label("menu", font_small, "Menu", BLACK)
+    
+    play_rect = play_text.get_rect(center=play_button.center)
+    pass_rect = pass_text.get_rect(center=pass_button.center)
+    restart_rect = restart_text.get_rect(center=restart_button.center)
+    
+    surface.blit(play_text, play_rect)
+    surface.blit(pass_text, pass_rect)
+    surface.blit(restart_text, restart_rect)
+    
+    for i, player in enumerate(game.players):
+        pos_x, pos_y, is_horizontal = PLAYER_POSITIONS[i]
+        clickable = player.is_human and i == game.current_player
+        show_cards = player.is_human or show_all
+        draw_player_cards(surface, player, pos_x, pos_y, clickable, show_cards, is_horizontal)
+    
+    current_text = render_label("turn", font_medium, f"Turn: {game.players[game.current_player].name}", YELLOW)
+    surface.blit(current_text, (400, 300))
+    
+    if status:
+        status_text = render_label("status", font_small, status, WHITE)
+        surface.blit(status_text, (855, 15))
+        keys_text = render_label("keys", font_overlay, "Space pause  N step  E end  +/- speed", WHITE)
+        surface.blit(keys_text, (855, 45))
+    
+    if game.last_played_info:
+        player_name, played_cards = game.last_played_info
+        description = get_card_description(played_cards, game.last_hand.hand_type if game.last_hand else None)
+    
+        info_text = render_label("played", font_small, f"{player_name} played: {description}", WHITE)
+        surface.blit(info_text, (400, 340))
+    
+        draw_played_cards(surface, played_cards)
+    
+    elif game.last_hand:
+        last_hand_text = render_label("last", font_small, "Last played:", WHITE)
+        surface.blit(last_hand_text, (400, 340))
+    
+        draw_played_cards(surface, game.last_hand.cards)
+    
+    if game.winner:
+        winner_text = render_label("winner", font_large, f"{game.winner.name} WINS!", YELLOW)
+        winner_rect = winner_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2))
+        surface.blit(winner_text, winner_rect)
+    
+        restart_text = render_label("return", font_small, "Click to return to start screen", WHITE)
+        restart_rect = restart_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 60))
+        surface.blit(restart_text, restart_rect)
+
+def draw_played_cards(surface, cards: List[Card]):
+    pitch = PLAYED_PITCH
+    if len(cards) > 1:
+        pitch = min(pitch, (PLAYED_RECT.width - CARD_WIDTH) // (len(cards) - 1))
+    for i, card in enumerate(cards):
+        draw_card(surface, card, PLAYED_RECT.x + i * pitch, 360, CARD_WIDTH, CARD_HEIGHT)
+
+def player_area(i: int) -> pygame.Rect:
+    x, y, horizontal = PLAYER_POSITIONS[i]
+    if horizontal:
+        return pygame.Rect(x, y - 25, 12 * 40 + CARD_WIDTH, CARD_HEIGHT + 50)
+    return pygame.Rect(x, y, CARD_WIDTH + 130, 12 * 20 + CARD_HEIGHT)
+
+TABLE_REGIONS = {
+    ("player", 0): player_area(0),
+    ("player", 1): player_area(1),
+    ("player", 2): player_area(2),
+    ("player", 3): player_area(3),
+    "turn": pygame.Rect(400, 295, 450, 40),
+    "played": PLAYED_RECT,
+    "winner": pygame.Rect(SCREEN_WIDTH//2 - 300, SCREEN_HEIGHT//2 - 40, 600, 120),
+    "status": pygame.Rect(850, 10, 345, 60),
+}
+
+def table_views(game: Game, show_all: bool = False, status: Optional[str] = None) -> dict:
+    views = {}
+    for i, player in enumerate(game.players):
+        clickable = player.is_human and i == game.current_player
+        selected = cards_to_mask(player.selected_cards) if clickable else 0
+        views[("player", i)] = (player.mask, selected, clickable, player.is_human or show_all)
+    
+    views["turn"] = game.current_player
+    if game.last_played_info:
+        views["played"] = (game.last_played_info[0], cards_to_mask(game.last_played_info[1]))
+    else:
+        views["played"] = (None, game.last_hand.mask if game.last_hand else 0)
+    views["winner"] = game.winner.name if game.winner else None
+    views["status"] = status
+    return views
+
+def redraw_table(surface, game: Game, drawn_views: Optional[dict], show_all: bool = False,
+                 status: Optional[str] = None) -> dict:
+    views = table_views(game, show_all, status)
+    
+    if drawn_views is None:
+        draw_table(surface, game, show_all, status)
+        pygame.display.flip()
+        return views
+    
+    dirty = [TABLE_REGIONS[key] for key, view in views.items() if drawn_views.get(key) != view]
+    if dirty:
+        for rect in dirty:
+            surface.set_clip(rect)
+            draw_table(surface, game, show_all, status)
+        surface.set_clip(None)
+        pygame.display.update(dirty)
+    return views
+
+def draw_overlay(surface):
+    pygame.draw.rect(surface, BLACK, OVERLAY_RECT)
+    pygame.draw.rect(surface, YELLOW, OVERLAY_RECT, 1)
+    
+    line_height = 16
+    max_lines = (OVERLAY_RECT.height - 10) // line_height
+    for i, line in enumerate(instrument.overlay_lines()[:max_lines]):
+        text = render_label(("overlay", i), font_overlay, line, WHITE)
+        surface.blit(text, (OVERLAY_RECT.x + 5, OVERLAY_RECT.y + 5 + i * line_height))
+    pygame.display.update(OVERLAY_RECT)
+
+class Spectator:
+    def __init__(self, speed: float = 1.0, fps: int = 30):
+        self.speed = speed
+        self.frame_time = 1 / fps
+        self.paused = False
+        self.jumping = False
+        self.steps = 0
+        self.credit = 0.0
+        self.dirty = True
+        self.games = 0
+        self.turns = 0
+        self.rate = 0.0
+        self.finished_at = None
+        self.last_tick = time.perf_counter()
+        self.last_frame = 0.0
+        self.rate_start = self.last_tick
+        self.rate_turns = 0
+    
+    def flat_out(self) -> bool:
+        return self.speed <= 0 or self.jumping
+    
+    def turn_rate(self) -> float:
+        return self.speed * 1000 / AI_DELAY_MS
+    
+    def handle_key(self, key: int):
+        if key == pygame.K_SPACE:
+            self.paused = not self.paused
+            self.credit = 0.0
+        elif key in (pygame.K_n, pygame.K_RIGHT):
+            self.steps += 1
+        elif key in (pygame.K_e, pygame.K_END):
+            self.jumping = True
+        elif key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+            self.speed = min(self.speed * 2, MAX_SPEED) if self.speed > 0 else self.speed
+        elif key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+            self.speed = self.speed / 2 if self.speed > 0 else MAX_SPEED
+        self.dirty = True
+    
+    def advance(self, game: Game):
+        now = time.perf_counter()
+        if not self.paused and not self.flat_out():
+            limit = max(1.0, self.turn_rate() * self.frame_time)
+            self.credit = min(self.credit + (now - self.last_tick) * self.turn_rate(), limit)
+        self.last_tick = now
+        
+        deadline = now + self.frame_time
+        played = 0
+        while not game.winner:
+            if self.steps:
+                self.steps -= 1
+            elif self.flat_out():
+                if played and time.perf_counter() >= deadline:
+                    break
+            elif self.paused or self.credit < 1:
+                break
+            else:
+                self.credit -= 1
+            game.ai_play(game.players[game.current_player])
+            played += 1
+        
+        if game.winner:
+            self.steps = 0
+            if self.jumping:
+                self.jumping = False
+                self.paused = True
+        if played:
+            self.turns += played
+            self.dirty = True
+    
+    def next_game_due(self, game: Game) -> bool:
+        now = time.perf_counter()
+        self.jumping = False
+        if self.finished_at is None:
+            self.finished_at = now
+            self.games += 1
+            self.dirty = True
+        if self.paused:
+            return False
+        return now - self.finished_at >= self.hold_time()
+    
+    def start_game(self):
+        self.finished_at = None
+        self.credit = 0.0
+        self.last_tick = time.perf_counter()
+    
+    def hold_time(self) -> float:
+        return 0.0 if self.speed <= 0 else AI_DELAY_MS / 1000 / self.speed
+    
+    def timeout_ms(self, game: Game) -> Optional[int]:
+        now = time.perf_counter()
+        if game.winner:
+            if self.finished_at is None:
+                wait = 0.0
+            else:
+                wait = None if self.paused else self.finished_at + self.hold_time() - now
+        elif self.steps or self.flat_out():
+            wait = 0.0
+        elif self.paused:
+            wait = None
+        else:
+            wait = (1 - self.credit) / self.turn_rate()
+        
+        if self.dirty:
+            frame_wait = self.last_frame + self.frame_time - now
+            wait = frame_wait if wait is None else min(wait, frame_wait)
+        if wait is None:
+            return None
+        return max(int(wait * 1000), 0)
+    
+    def frame_due(self) -> bool:
+        now = time.perf_counter()
+        if now - self.rate_start >= 1.0:
+            self.rate = (self.turns - self.rate_turns) / (now - self.rate_start)
+            self.rate_start = now
+            self.rate_turns = self.turns
+            self.dirty = True
+        if not self.dirty or now - self.last_frame < self.frame_time:
+            return False
+        self.last_frame = now
+        self.dirty = False
+        return True
+    
+    def status(self) -> str:
+        speed = "max" if self.speed <= 0 else f"x{self.speed:g}"
+        text = f"Game {self.games + 1}  {speed}  {self.rate:.0f} turns/s"
+        return text + "  PAUSED" if self.paused else text
+
+def new_game(ai_policy, spectate: bool = False, rules: Optional[RuleSet] = None) -> Game:
+    game = Game(rules=rules)
+    for player in game.players:
+        if spectate:
+            player.is_human = False
+        if not player.is_human:
+            player.policy = ai_policy
+    if ai_policy is not None:
+        game.tracker = BeliefTracker()
+    game.deal_cards()
+    return game
+
+def main(ai_mode: str = "simple", think_time: float = 1.0, workers: int = 1, endgame_threshold: int = 0,
+         atlas_path: Optional[str] = None, profile: bool = False, profile_export: Optional[str] = None,
+         profile_interval: float = 10.0, spectate: bool = False, speed: float = 1.0, fps: int = 30,
+         rules_name: str = "simple"):
+    rules = RULES[rules_name]
+    ai_policy = create_ai_policy(ai_mode, think_time, workers, endgame_threshold)
+    init_display(atlas_path)
+    
+    exporter = None
+    show_overlay = False
+    if profile or profile_export:
+        instrument.enable()
+        show_overlay = profile
+        pygame.time.set_timer(OVERLAY_REFRESH, 1000)
+        if profile_export:
+            exporter = instrument.PeriodicExporter(profile_export, profile_interval)
+            exporter.start()
+    
+    spectator = Spectator(speed, fps) if spectate else None
+    game = new_game(ai_policy, True, rules) if spectator is not None else None
+    start_mode = spectator is None
+    ai_pending = False
+    drawn_views = None
+    start_drawn = False
     
     running = True
     while running:
-        for event in pygame.event.get():
+        timeout = spectator.timeout_ms(game) if spectator is not None and game else None
+        wait_start = time.perf_counter()
+        if timeout == 0:
+            events = pygame.event.get()
+        else:
+            events = [pygame.event.wait(timeout) if timeout else pygame.event.wait()]
+            events.extend(pygame.event.get())
+        if instrument.enabled:
+            instrument.record("idle_wait", time.perf_counter() - wait_start)
+        
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
             
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED):
+                drawn_views = None
+                start_drawn = False
+            
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3 and instrument.enabled:
+                show_overlay = not show_overlay
+                drawn_views = None
+                start_drawn = False
+            
+            elif event.type == pygame.KEYDOWN and spectator is not None:
+                spectator.handle_key(event.key)
+            
+            elif event.type == AI_TURN:
+                ai_pending = False
+                if game and game.game_started and not game.winner and not game.is_current_player_human():
+                    game.ai_play(game.players[game.current_player])
+            
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 mouse_pos = pygame.mouse.get_pos()
                 
                 if start_mode:
                     start_button = draw_start_screen(screen)
                     if start_button.collidepoint(mouse_pos):
-                        game = Game()
-                        game.deal_cards()
+                        game = new_game(ai_policy, spectator is not None, rules)
+                        if spectator is not None:
+                            spectator.start_game()
                         start_mode = False
+                        drawn_views = None
                 
                 elif game and game.game_started:
                     play_button = pygame.Rect(50, 550, 80, 40)
                     pass_button = pygame.Rect(140, 550, 80, 40)
                     restart_button = pygame.Rect(230, 550, 80, 40)
                     
-                    if restart_button.collidepoint(mouse_pos):
-                        start_mode = True
-                        game = None
-                    
-                    elif game.winner and mouse_pos:
+                    if restart_button.collidepoint(mouse_pos) or game.winner:
                         start_mode = True
+                        start_drawn = False
                         game = None
+                        pygame.time.set_timer(AI_TURN, 0)
+                        ai_pending = False
                     
                     elif play_button.collidepoint(mouse_pos) and game.is_current_player_human():
                         current_player = game.players[game.current_player]
                         if current_player.selected_cards:
-                            hand = Hand(current_player.selected_cards)
-                            if not game.last_hand or hand.can_beat(game.last_hand):
-                                game.play_cards(current_player, current_player.selected_cards.copy())
+                            if cards_to_mask(current_player.selected_cards) in game.valid_masks(current_player):
+                                game.play_cards(current_player, sorted(current_player.selected_cards))
                                 current_player.selected_cards.clear()
                     
                     elif pass_button.collidepoint(mouse_pos) and game.is_current_player_human():
-                        game.passes += 1
-                        game.next_turn()
+                        game.pass_turn()
                     
                     elif game.is_current_player_human():
-                        player_positions = [
-                            (300, 680, True),   
-                            (50, 200, False),  
-                            (300, 50, True),    
-                            (1050, 200, False)  
-                        ]
-                        
                         for i, player in enumerate(game.players):
                             if player.is_human and i == game.current_player:
-                                pos_x, pos_y, is_horizontal = player_positions[i]
+                                pos_x, pos_y, is_horizontal = PLAYER_POSITIONS[i]
                                 handle_card_click(player, mouse_pos, pos_x, pos_y, is_horizontal)
         
+        frame_start = time.perf_counter()
         if start_mode:
-            draw_start_screen(screen)
+            if not start_drawn:
+                draw_start_screen(screen)
+                pygame.display.flip()
+                start_drawn = True
         
-        elif game and game.game_started:
-            current_time = pygame.time.get_ticks()
-            
-            if not game.winner and not game.is_current_player_human():
-                if game.ai_played_time == 0:
-                    game.ai_played_time = current_time
-                elif current_time - game.ai_played_time >= 5000:
-                    game.ai_play(game.players[game.current_player])
-                    game.ai_played_time = 0
-            
-            screen.fill(GREEN)
-            
-            play_button = pygame.Rect(50, 550, 80, 40)
-            pass_button = pygame.Rect(140, 550, 80, 40)
-            restart_button = pygame.Rect(230, 550, 80, 40)
-            
-            pygame.draw.rect(screen, LIGHT_GRAY, play_button)
-            pygame.draw.rect(screen, LIGHT_GRAY, pass_button) 
-            pygame.draw.rect(screen, LIGHT_GRAY, restart_button)
-            pygame.draw.rect(screen, BLACK, play_button, 2)
-            pygame.draw.rect(screen, BLACK, pass_button, 2)
-            pygame.draw.rect(screen, BLACK, restart_button, 2)
-            
-            play_text = font_medium.render("Play", True, BLACK)
-            pass_text = font_medium.render("Pass", True, BLACK)
-            restart_text = font_small.render("Menu", True, BLACK)
-            
-            play_rect = play_text.get_rect(center=play_button.center)
-            pass_rect = pass_text.get_rect(center=pass_button.center)
-            restart_rect = restart_text.get_rect(center=restart_button.center)
-            
-            screen.blit(play_text, play_rect)
-            screen.blit(pass_text, pass_rect)
-            screen.blit(restart_text, restart_rect)
+        elif game and game.game_started and spectator is not None:
+            if not game.winner:
+                spectator.advance(game)
+            elif spectator.next_game_due(game):
+                game = new_game(ai_policy, True, rules)
+                spectator.start_game()
             
-            player_positions = [
-                (300, 680, True),   
-                (50, 200, False),   
-                (300, 50, True),    
-                (1050, 200, False) 
-            ]
-            
-            for i, player in enumerate(game.players):
-                pos_x, pos_y, is_horizontal = player_positions[i]
-                clickable = player.is_human and i == game.current_player
-                show_cards = player.is_human
-                draw_player_cards(screen, player, pos_x, pos_y, clickable, show_cards, is_horizontal)
-            
-            current_text = font_medium.render(f"Turn: {game.players[game.current_player].name}", True, YELLOW)
-            screen.blit(current_text, (400, 300))
-            
-            if game.last_played_info:
-                player_name, played_cards = game.last_played_info
-                description = get_card_description(played_cards)
-                
-                info_text = font_small.render(f"{player_name} played: {description}", True, WHITE)
-                screen.blit(info_text, (400, 340))
-                
-                for i, card in enumerate(played_cards):
-                    draw_card(screen, card, 400 + i * 60, 360, 50, 70)
-            
-            elif game.last_hand:
-                last_hand_text = font_small.render("Last played:", True, WHITE)
-                screen.blit(last_hand_text, (400, 340))
-                
-                for i, card in enumerate(game.last_hand.cards):
-                    draw_card(screen, card, 400 + i * 60, 360, 50, 70)
+            if spectator.frame_due():
+                drawn_views = redraw_table(screen, game, drawn_views, True, spectator.status())
+        
+        elif game and game.game_started:
+            if not ai_pending and not game.winner and not game.is_current_player_human():
+                pygame.time.set_timer(AI_TURN, AI_DELAY_MS, 1)
+                ai_pending = True
             
-            if game.winner:
-                winner_text = font_large.render(f"{game.winner.name} WINS!", True, YELLOW)
-                winner_rect = winner_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2))
-                screen.blit(winner_text, winner_rect)
-                
-                restart_text = font_small.render("Click to return to start screen", True, WHITE)
-                restart_rect = restart_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 60))
-                screen.blit(restart_text, restart_rect)
+            drawn_views = redraw_table(screen, game, drawn_views)
         
-        pygame.display.flip()
-        clock.tick(60)
-    
+        if instrument.enabled:
+            instrument.record("frame", time.perf_counter() - frame_start)
+            if show_overlay:
+                draw_overlay(screen)
+    
+    if exporter is not None:
+        exporter.stop()
+    if ai_policy is not None:
+        ai_policy.close()
     pygame.quit()
     sys.exit()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Tien Len Mien Nam")
+    parser.add_argument("--ai", choices=["simple", "ismcts"], default="simple")
+    parser.add_argument("--think-time", type=float, default=1.0, help="seconds per ISMCTS move")
+    parser.add_argument("--workers", type=int, default=1, help="processes for ISMCTS rollouts")
+    parser.add_argument("--endgame-threshold", type=int, default=0,
+                        help="solve exactly once this many cards are left on the table (0 = off)")
+    parser.add_argument("--atlas", help="PNG file to load the card atlas from, or save it to on first run")
+    parser.add_argument("--profile", action="store_true", help="collect timings and show them on screen (F3 toggles)")
+    parser.add_argument("--profile-export", help="write timing snapshots to this .json or .csv file")
+    parser.add_argument("--profile-interval", type=float, default=10.0, help="seconds between snapshots")
+    parser.add_argument("--spectate", action="store_true", help="watch four computer players with every hand face up")
+    parser.add_argument("--speed", type=float, default=1.0, help="spectator speed multiplier, 0 for as fast as possible")
+    parser.add_argument("--fps", type=int, default=30, help="spectator frame rate cap")
+    parser.add_argument("--rules", choices=sorted(RULES), default="simple",
+                        help="full adds 3-12 card straights, pair sequences and chopping 2s")
+    args = parser.parse_args()
+    main(args.ai, args.think_time, args.workers, args.endgame_threshold, args.atlas,
+         args.profile, args.profile_export, args.profile_interval, args.spectate, args.speed, args.fps, args.rules)
@@ -0,0 +1,28 @@
+from itertools import combinations
+from typing import List
+
+from cards import VALUE_MASK
+
+NUM_VALUES = 13
+
+def _subsets(size: int) -> List[List[int]]:
+    table = []
+    for suits in range(16):
+        present = [suit for suit in range(4) if suits >> suit & 1]
+        subsets = []
+        for combo in combinations(present, size):
+            bits = 0
+            for suit in combo:
+                bits |= 1 << suit
+            subsets.append(bits)
+        subsets.sort()
+        table.append(subsets)
+    return table
+
+SINGLES = _subsets(1)
+PAIRS = _subsets(2)
+TRIPLES = _subsets(3)
+SUIT_COUNTS = [bin(suits).count("1") for suits in range(16)]
+
+def suits_from_mask(mask: int) -> List[int]:
+    return [(mask >> (value * 4)) & VALUE_MASK for value in range(NUM_VALUES)]
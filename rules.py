@@ -0,0 +1,224 @@
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from cards import INVALID_HAND, HandType, VALUE_MASK, lookup_hand, sort_value
+from movegen import NUM_VALUES, PAIRS, SINGLES, SUIT_COUNTS, TRIPLES, suits_from_mask
+
+TWO = NUM_VALUES - 1
+QUADS = [[suits] if suits == VALUE_MASK else [] for suits in range(16)]
+SUBSETS = {1: SINGLES, 2: PAIRS, 3: TRIPLES, 4: QUADS}
+MEMO_LIMIT = 1 << 16
+
+HandInfo = Tuple[Optional[HandType], int]
+
+class Family:
+    def __init__(self, hand_type: HandType, width: int, lengths: Sequence[int] = (1,), twos: bool = True,
+                 rank: str = "value", scale: int = 100):
+        self.hand_type = hand_type
+        self.width = width
+        self.lengths = tuple(lengths)
+        self.twos = twos
+        self.rank = rank
+        self.scale = scale
+        self.max_value = TWO if twos else TWO - 1
+        self.is_set = self.lengths == (1,)
+        self.subsets = SUBSETS[width]
+        self.top_ranks = [[self.top_rank(value, suits) for suits in range(16)] for value in range(NUM_VALUES)]
+
+    def top_rank(self, value: int, suits: int) -> int:
+        if not suits:
+            return -1
+        top_suit = suits.bit_length() - 1
+        if self.rank == "card":
+            return sort_value(value * 4 + top_suit)
+        if self.rank == "value_suit":
+            return (value + 3) * self.scale + top_suit
+        return (value + 3) * self.scale
+
+    def top_value(self, rank: int) -> int:
+        if self.rank == "card":
+            return rank // 10 - 3
+        return rank // self.scale - 3
+
+    def shapes(self) -> List[Tuple[int, Tuple[int, ...]]]:
+        return [(top - length + 1, (self.width,) * length)
+                for length in self.lengths for top in range(length - 1, self.max_value + 1)]
+
+    def rank_of(self, mask: int) -> int:
+        top = (mask.bit_length() - 1) >> 2
+        return self.top_ranks[top][mask >> (top * 4) & VALUE_MASK]
+
+    def generate(self, value_suits: List[int], value_counts: List[int], moves: List[int], length: int = 0, rank: int = -1):
+        width = self.width
+        subsets = self.subsets
+        top_ranks = self.top_ranks
+        start = -1 if rank < 0 else self.top_value(rank)
+        if self.is_set:
+            for value in range(max(start, 0), self.max_value + 1):
+                if value_counts[value] >= width:
+                    ranks = top_ranks[value]
+                    shift = value * 4
+                    for bits in subsets[value_suits[value]]:
+                        if ranks[bits] > rank:
+                            moves.append(bits << shift)
+            return
+
+        lengths = (length,) if length else self.lengths
+        streak = 0
+        for top in range(self.max_value + 1):
+            streak = streak + 1 if value_counts[top] >= width else 0
+            if streak < lengths[0] or top < start:
+                continue
+            ranks = top_ranks[top]
+            shift = top * 4
+            tops = [bits << shift for bits in subsets[value_suits[top]] if ranks[bits] > rank]
+            if not tops:
+                continue
+            partial = [0]
+            low = top
+            for run in lengths:
+                if run > streak:
+                    break
+                while low > top - run + 1:
+                    low -= 1
+                    shift = low * 4
+                    partial = [mask | bits << shift for bits in subsets[value_suits[low]] for mask in partial]
+                moves.extend([mask | bits for mask in partial for bits in tops])
+
+class Chop:
+    def __init__(self, attacker: HandType, attacker_cards: int, defender: HandType, defender_cards: int, min_rank: int = 0):
+        self.attacker = attacker
+        self.attacker_cards = attacker_cards
+        self.defender = defender
+        self.defender_cards = defender_cards
+        self.min_rank = min_rank
+
+class RuleSet:
+    def __init__(self, name: str, families: Sequence[Family], chops: Sequence[Chop] = (), open_with_single: bool = True,
+                 table: Optional[Callable[[int], HandInfo]] = None, memo_limit: int = MEMO_LIMIT):
+        self.name = name
+        self.families = list(families)
+        self.chops = list(chops)
+        self.open_with_single = open_with_single
+        self.by_type = {family.hand_type: family for family in self.families}
+        self.shapes: Dict[Tuple[int, Tuple[int, ...]], Family] = {}
+        for family in self.families:
+            for shape in family.shapes():
+                self.shapes[shape] = family
+        self.chop_ranks: Dict[Tuple[int, int], List[Tuple[HandType, HandType, int]]] = {}
+        self.chops_against: Dict[int, List[Tuple[HandType, Family, int, int]]] = {}
+        for chop in self.chops:
+            self.chop_ranks.setdefault((chop.attacker_cards, chop.defender_cards), []).append(
+                (chop.attacker, chop.defender, chop.min_rank))
+            attacker = self.by_type[chop.attacker]
+            self.chops_against.setdefault(chop.defender_cards, []).append(
+                (chop.defender, attacker, chop.attacker_cards // attacker.width, chop.min_rank))
+        self.memo: Dict[int, HandInfo] = {}
+        self.memo_limit = memo_limit
+        if table is not None:
+            self.lookup = table
+
+    def __reduce__(self):
+        return get_rules, (self.name,)
+
+    def classify(self, mask: int) -> HandInfo:
+        if not mask:
+            return INVALID_HAND
+        low = ((mask & -mask).bit_length() - 1) >> 2
+        high = (mask.bit_length() - 1) >> 2
+        pattern = tuple([SUIT_COUNTS[mask >> (value * 4) & VALUE_MASK] for value in range(low, high + 1)])
+        family = self.shapes.get((low, pattern))
+        if family is None:
+            return INVALID_HAND
+        return family.hand_type, family.rank_of(mask)
+
+    def lookup(self, mask: int) -> HandInfo:
+        info = self.memo.get(mask)
+        if info is None:
+            if len(self.memo) >= self.memo_limit:
+                del self.memo[next(iter(self.memo))]
+            info = self.memo[mask] = self.classify(mask)
+        return info
+
+    def beats(self, hand_type: Optional[HandType], rank: int, cards: int, last_type: Optional[HandType], last_rank: int,
+              last_cards: int) -> bool:
+        if hand_type is None:
+            return False
+        if hand_type is last_type and cards == last_cards:
+            return rank > last_rank
+        for attacker, defender, min_rank in self.chop_ranks.get((cards, last_cards), ()):
+            if attacker is hand_type and defender is last_type:
+                return last_rank >= min_rank
+        return False
+
+    def mask_can_beat(self, mask: int, last_mask: int) -> bool:
+        if not last_mask:
+            return True
+        return self.beats(*self.lookup(mask), mask.bit_count(), *self.lookup(last_mask), last_mask.bit_count())
+
+    def generate(self, value_suits: List[int], value_counts: List[int], hand_type: Optional[HandType] = None,
+                 rank: int = -1, cards: int = 0) -> List[int]:
+        moves = []
+        if hand_type is None:
+            for family in self.families:
+                family.generate(value_suits, value_counts, moves)
+            return moves
+        family = self.by_type.get(hand_type)
+        if family is not None:
+            family.generate(value_suits, value_counts, moves, cards // family.width, rank)
+        for defender, attacker, length, min_rank in self.chops_against.get(cards, ()):
+            if defender is hand_type and rank >= min_rank:
+                attacker.generate(value_suits, value_counts, moves, length)
+        return moves
+
+    def generate_from_mask(self, mask: int, hand_type: Optional[HandType] = None, rank: int = -1, cards: int = 0) -> List[int]:
+        value_suits = suits_from_mask(mask)
+        value_counts = [SUIT_COUNTS[suits] for suits in value_suits]
+        return self.generate(value_suits, value_counts, hand_type, rank, cards)
+
+    def openings_from_mask(self, mask: int) -> List[int]:
+        value_suits = suits_from_mask(mask)
+        return self.opening_moves(value_suits, [SUIT_COUNTS[suits] for suits in value_suits])
+
+    def responses(self, holding: int, last_mask: int) -> List[int]:
+        if not last_mask:
+            return self.generate_from_mask(holding)
+        hand_type, rank = self.lookup(last_mask)
+        return self.generate_from_mask(holding, hand_type, rank, last_mask.bit_count())
+
+    def opening_moves(self, value_suits: List[int], value_counts: List[int]) -> List[int]:
+        if not value_suits[0] & 1:
+            return []
+        if self.open_with_single:
+            return [1]
+        return [move for move in self.generate(value_suits, value_counts) if move & 1]
+
+SIMPLE_RULES = RuleSet("simple", [
+    Family(HandType.SINGLE, 1, rank="card"),
+    Family(HandType.PAIR, 2, rank="value_suit", scale=100),
+    Family(HandType.TRIPLE, 3, scale=1000),
+    Family(HandType.QUAD, 4, scale=10000),
+    Family(HandType.STRAIGHT, 1, (5,), scale=100),
+], table=lookup_hand)
+
+FULL_RULES = RuleSet("full", [
+    Family(HandType.SINGLE, 1, rank="card"),
+    Family(HandType.PAIR, 2, rank="value_suit", scale=100),
+    Family(HandType.TRIPLE, 3, scale=1000),
+    Family(HandType.QUAD, 4, scale=10000),
+    Family(HandType.STRAIGHT, 1, range(3, 13), twos=False, rank="value_suit", scale=100),
+    Family(HandType.PAIR_SEQUENCE, 2, range(3, 7), twos=False, rank="value_suit", scale=100),
+], [
+    Chop(HandType.PAIR_SEQUENCE, 6, HandType.SINGLE, 1, 150),
+    Chop(HandType.QUAD, 4, HandType.SINGLE, 1, 150),
+    Chop(HandType.QUAD, 4, HandType.PAIR, 2, 1500),
+    Chop(HandType.QUAD, 4, HandType.PAIR_SEQUENCE, 6),
+    Chop(HandType.PAIR_SEQUENCE, 8, HandType.SINGLE, 1, 150),
+    Chop(HandType.PAIR_SEQUENCE, 8, HandType.PAIR, 2, 1500),
+    Chop(HandType.PAIR_SEQUENCE, 8, HandType.QUAD, 4),
+    Chop(HandType.PAIR_SEQUENCE, 8, HandType.PAIR_SEQUENCE, 6),
+], open_with_single=False)
+
+RULES = {rules.name: rules for rules in (SIMPLE_RULES, FULL_RULES)}
+
+def get_rules(name: str) -> RuleSet:
+    return RULES[name]
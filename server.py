@@ -0,0 +1,412 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Deque, Dict, List, Optional
+
+from ai import init_worker, think
+from belief import BeliefTracker
+from cards import NUM_CARDS, iter_indices, mask_to_cards
+from engine import PASS, Game
+from instrument import Histogram
+
+OUTBOX_SIZE = 32
+LINE_LIMIT = 1 << 16
+LAG_INTERVAL = 0.1
+
+def mask_to_indices(mask: int) -> List[int]:
+    return list(iter_indices(mask))
+
+class Connection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.outbox: Deque[dict] = deque()
+        self.ready = asyncio.Event()
+        self.dropped = 0
+        self.table: Optional["Table"] = None
+        self.seat: Optional[int] = None
+
+    def send(self, message: dict):
+        if message["type"] == "state":
+            for index, queued in enumerate(self.outbox):
+                if queued["type"] == "state":
+                    del self.outbox[index]
+                    self.dropped += 1
+                    break
+        elif len(self.outbox) >= OUTBOX_SIZE:
+            self.writer.close()
+            return
+        self.outbox.append(message)
+        self.ready.set()
+
+    async def pump(self):
+        while True:
+            await self.ready.wait()
+            while self.outbox:
+                self.writer.write(json.dumps(self.outbox.popleft()).encode() + b"\n")
+                await self.writer.drain()
+            self.ready.clear()
+
+class Table:
+    def __init__(self, table_id: int, humans: int, executor: Optional[ProcessPoolExecutor], ai_delay: float = 0.0):
+        self.id = table_id
+        self.humans = humans
+        self.executor = executor
+        self.ai_delay = ai_delay
+        self.game = Game()
+        if executor is not None:
+            self.game.tracker = BeliefTracker()
+        for player in self.game.players:
+            player.is_human = False
+        self.connections: Dict[int, Connection] = {}
+        self.changed = asyncio.Event()
+        self.turn = 0
+        self.turn_started = 0.0
+        self.closed = False
+        self.metrics = {
+            "action": Histogram(),
+            "human_turn": Histogram(),
+            "ai_move": Histogram(),
+        }
+
+    def open_seats(self) -> List[int]:
+        if self.game.game_started or self.closed:
+            return []
+        return [seat for seat in range(self.humans) if seat not in self.connections]
+
+    def sit(self, connection: Connection) -> int:
+        seat = self.open_seats()[0]
+        self.connections[seat] = connection
+        self.game.players[seat].is_human = True
+        connection.table = self
+        connection.seat = seat
+        if len(self.connections) == self.humans:
+            self.game.deal_cards()
+            self.turn_started = time.perf_counter()
+        self.changed.set()
+        return seat
+
+    def leave(self, connection: Connection):
+        seat = connection.seat
+        if self.connections.get(seat) is connection:
+            del self.connections[seat]
+            self.game.players[seat].is_human = False
+        connection.table = None
+        connection.seat = None
+        self.changed.set()
+
+    def state(self, seat: int) -> dict:
+        game = self.game
+        last_mask = game.last_hand.mask if game.last_hand else 0
+        message = {
+            "type": "state",
+            "table": self.id,
+            "seat": seat,
+            "turn": self.turn,
+            "started": game.game_started,
+            "current": game.current_player,
+            "hand": mask_to_indices(game.players[seat].mask),
+            "counts": [len(player.cards) for player in game.players],
+            "last": mask_to_indices(last_mask),
+            "last_player": game.last_player,
+            "winner": game.players.index(game.winner) if game.winner else None,
+        }
+        if game.game_started and not game.winner and game.current_player == seat:
+            message["legal"] = [mask_to_indices(move) for move in game.legal_moves()]
+        return message
+
+    def broadcast(self):
+        for seat, connection in self.connections.items():
+            connection.send(self.state(seat))
+
+    def play(self, seat: int, mask: int):
+        game = self.game
+        if mask == PASS:
+            game.pass_turn()
+        else:
+            game.play_cards(game.players[seat], mask_to_cards(mask))
+        self.turn += 1
+        self.turn_started = time.perf_counter()
+        self.broadcast()
+        self.changed.set()
+
+    def act(self, seat: int, mask: int) -> Optional[str]:
+        game = self.game
+        if not game.game_started:
+            return "waiting for players"
+        if game.winner:
+            return "game is over"
+        if game.current_player != seat:
+            return "not your turn"
+        if mask not in game.legal_moves():
+            return "illegal move"
+        self.metrics["human_turn"].add(time.perf_counter() - self.turn_started)
+        self.play(seat, mask)
+        return None
+
+    async def think(self, seat: int) -> int:
+        game = self.game
+        if self.executor is None:
+            moves = game.valid_masks(game.players[seat])
+            return moves[0] if moves else PASS
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, think, game.snapshot(), game.rules.name, game.tracker)
+
+    async def run(self):
+        game = self.game
+        while not self.closed and self.connections and not game.winner:
+            self.changed.clear()
+            if not game.game_started or game.is_current_player_human():
+                await self.changed.wait()
+                continue
+
+            if self.ai_delay:
+                await asyncio.sleep(self.ai_delay)
+            seat = game.current_player
+            start = time.perf_counter()
+            mask = await self.think(seat)
+            self.metrics["ai_move"].add(time.perf_counter() - start)
+            if game.current_player == seat and not game.winner:
+                self.play(seat, mask)
+        self.closed = True
+
+    def stats(self) -> dict:
+        return {
+            "turn": self.turn,
+            "humans": len(self.connections),
+            "metrics": {name: histogram.summary() for name, histogram in self.metrics.items()},
+        }
+
+class GameServer:
+    def __init__(self, humans: int = 1, max_tables: int = 1000, ai_mode: str = "simple", think_time: float = 1.0,
+                 workers: int = 1, endgame_threshold: int = 0, ai_delay: float = 0.0):
+        self.humans = humans
+        self.max_tables = max_tables
+        self.ai_delay = ai_delay
+        self.executor = None
+        if ai_mode != "simple" or endgame_threshold > 0:
+            self.executor = ProcessPoolExecutor(workers, multiprocessing.get_context("spawn"), init_worker,
+                                                (ai_mode, think_time, endgame_threshold))
+        self.tables: Dict[int, Table] = {}
+        self.next_table_id = 1
+        self.connections = 0
+        self.games_finished = 0
+        self.loop_lag = Histogram()
+
+    def open_table(self) -> Optional[Table]:
+        for table in self.tables.values():
+            if table.open_seats():
+                return table
+        if len(self.tables) >= self.max_tables:
+            return None
+
+        table = Table(self.next_table_id, self.humans, self.executor, self.ai_delay)
+        self.next_table_id += 1
+        self.tables[table.id] = table
+        asyncio.get_running_loop().create_task(self.run_table(table))
+        return table
+
+    async def run_table(self, table: Table):
+        try:
+            await table.run()
+        finally:
+            if table.game.winner:
+                self.games_finished += 1
+            del self.tables[table.id]
+
+    def dispatch(self, connection: Connection, request: dict):
+        op = request.get("op")
+        table = connection.table
+        if op == "join":
+            if table is not None and not table.closed and not table.game.winner:
+                connection.send({"type": "error", "message": "already seated"})
+                return
+            if table is not None:
+                table.leave(connection)
+            table = self.open_table()
+            if table is None:
+                connection.send({"type": "error", "message": "server full"})
+                return
+            seat = table.sit(connection)
+            connection.send({"type": "joined", "table": table.id, "seat": seat})
+            table.broadcast()
+        elif op in ("play", "pass"):
+            if table is None:
+                connection.send({"type": "error", "message": "not seated"})
+                return
+            start = time.perf_counter()
+            mask = PASS
+            if op == "play":
+                indices = request.get("cards")
+                if not indices or not all(isinstance(i, int) and 0 <= i < NUM_CARDS for i in indices):
+                    connection.send({"type": "error", "message": "bad cards"})
+                    return
+                mask = sum(1 << i for i in set(indices))
+            error = table.act(connection.seat, mask)
+            if error:
+                connection.send({"type": "error", "message": error})
+                return
+            table.metrics["action"].add(time.perf_counter() - start)
+        elif op == "state":
+            if table is None:
+                connection.send({"type": "error", "message": "not seated"})
+                return
+            connection.send(table.state(connection.seat))
+        elif op == "stats":
+            connection.send({"type": "stats", **self.stats()})
+        else:
+            connection.send({"type": "error", "message": f"unknown op {op!r}"})
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        connection = Connection(reader, writer)
+        pump = asyncio.get_running_loop().create_task(connection.pump())
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    connection.send({"type": "error", "message": "bad json"})
+                    continue
+                if not isinstance(request, dict):
+                    connection.send({"type": "error", "message": "bad request"})
+                    continue
+                self.dispatch(connection, request)
+        finally:
+            self.connections -= 1
+            if connection.table is not None:
+                connection.table.leave(connection)
+            pump.cancel()
+            writer.close()
+
+    async def monitor_lag(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(LAG_INTERVAL)
+            self.loop_lag.add(max(time.perf_counter() - start - LAG_INTERVAL, 0.0))
+
+    def stats(self) -> dict:
+        return {
+            "connections": self.connections,
+            "games_finished": self.games_finished,
+            "loop_lag": self.loop_lag.summary(),
+            "tables": {table_id: table.stats() for table_id, table in self.tables.items()},
+        }
+
+    async def start(self, host: str, port: int) -> asyncio.AbstractServer:
+        loop = asyncio.get_running_loop()
+        if self.executor is not None:
+            await loop.run_in_executor(self.executor, int)
+        loop.create_task(self.monitor_lag())
+        return await asyncio.start_server(self.handle, host, port, limit=LINE_LIMIT)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+
+async def run_bot(host: str, port: int, games: int = 1) -> List[float]:
+    reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+    latencies = []
+    sent_at = None
+    answered = None
+
+    def send(request: dict):
+        writer.write(json.dumps(request).encode() + b"\n")
+
+    send({"op": "join"})
+    while games:
+        line = await reader.readline()
+        if not line:
+            break
+        message = json.loads(line)
+        if message["type"] != "state":
+            continue
+        if sent_at is not None and message["turn"] != answered:
+            latencies.append(time.perf_counter() - sent_at)
+            sent_at = None
+        if message["winner"] is not None:
+            games -= 1
+            if games:
+                send({"op": "join"})
+            continue
+        if "legal" in message and message["turn"] != answered:
+            move = message["legal"][0]
+            send({"op": "play", "cards": move} if move else {"op": "pass"})
+            sent_at = time.perf_counter()
+            answered = message["turn"]
+        await writer.drain()
+    writer.close()
+    return latencies
+
+async def load_test(server: GameServer, host: str, port: int, bots: int, games: int):
+    tcp_server = await server.start(host, port)
+    port = tcp_server.sockets[0].getsockname()[1]
+    start = time.perf_counter()
+    results = await asyncio.gather(*(run_bot(host, port, games) for _ in range(bots)))
+    elapsed = time.perf_counter() - start
+    tcp_server.close()
+    while server.connections:
+        await asyncio.sleep(LAG_INTERVAL)
+
+    round_trip = Histogram()
+    for latencies in results:
+        for latency in latencies:
+            round_trip.add(latency)
+    print(f"games: {server.games_finished}")
+    print(f"games_per_second: {server.games_finished / elapsed:.1f}")
+    print(f"round_trip: {round_trip.summary()}")
+    print(f"loop_lag: {server.loop_lag.summary()}")
+
+async def serve(server: GameServer, host: str, port: int, stats_interval: float):
+    tcp_server = await server.start(host, port)
+    print(f"listening on {host}:{tcp_server.sockets[0].getsockname()[1]}", file=sys.stderr)
+    async with tcp_server:
+        while True:
+            await asyncio.sleep(stats_interval)
+            stats = server.stats()
+            print(f"tables: {len(stats['tables'])} connections: {stats['connections']} "
+                  f"games_finished: {stats['games_finished']} loop_lag: {stats['loop_lag']}", file=sys.stderr)
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Host many Tien Len tables over a line-JSON TCP protocol")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--humans", type=int, default=1, choices=range(1, 5), help="human seats per table")
+    parser.add_argument("--max-tables", type=int, default=1000)
+    parser.add_argument("--ai", choices=["simple", "ismcts"], default="simple")
+    parser.add_argument("--think-time", type=float, default=1.0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processes shared by every table for AI players that think")
+    parser.add_argument("--endgame-threshold", type=int, default=0)
+    parser.add_argument("--ai-delay", type=float, default=0.0, help="seconds to wait before each AI move")
+    parser.add_argument("--stats-interval", type=float, default=30.0)
+    parser.add_argument("--bots", type=int, default=0, help="run this many local bot clients and exit")
+    parser.add_argument("--bot-games", type=int, default=1, help="games each bot plays")
+    args = parser.parse_args(argv)
+
+    server = GameServer(args.humans, args.max_tables, args.ai, args.think_time, args.workers,
+                        args.endgame_threshold, args.ai_delay)
+    try:
+        if args.bots:
+            asyncio.run(load_test(server, args.host, args.port, args.bots, args.bot_games))
+        else:
+            asyncio.run(serve(server, args.host, args.port, args.stats_interval))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import argparse
+import os
+import random
+import sys
+import time
+from multiprocessing import Pool
+from typing import Iterator, List, Optional, Tuple
+
+from belief import BeliefTracker
+from engine import Game
+from gamelog import GameLogWriter
+from rules import RULES, RuleSet
+
+MAX_TURNS = 2000
+
+def game_rng(seed: int, index: int) -> random.Random:
+    return random.Random(f"{seed}:{index}")
+
+def play_game(rng: random.Random, recorder=None, policies: Optional[List] = None,
+              rules: Optional[RuleSet] = None) -> Tuple[Optional[int], int, int, int]:
+    game = Game(rng, rules)
+    game.recorder = recorder
+    for seat, player in enumerate(game.players):
+        player.is_human = False
+        if policies is not None:
+            player.policy = policies[seat]
+    if policies is not None and any(policy is not None for policy in policies):
+        game.tracker = BeliefTracker()
+    game.deal_cards()
+
+    turns = 0
+    passes = 0
+    while not game.winner and turns < MAX_TURNS:
+        player = game.players[game.current_player]
+        cards_before = len(player.cards)
+        game.ai_play(player)
+        if len(player.cards) == cards_before:
+            passes += 1
+        turns += 1
+
+    winner_seat = game.players.index(game.winner) if game.winner else None
+    if recorder is not None and winner_seat is None:
+        recorder.end_game(None)
+    cards_left = sum(len(player.cards) for player in game.players)
+    return winner_seat, turns, passes, cards_left
+
+class SimulationStats:
+    def __init__(self):
+        self.games = 0
+        self.unfinished = 0
+        self.wins = [0, 0, 0, 0]
+        self.turns = 0
+        self.passes = 0
+        self.cards_left = 0
+        self.max_turns = 0
+
+    def add(self, winner_seat: Optional[int], turns: int, passes: int, cards_left: int):
+        self.games += 1
+        if winner_seat is None:
+            self.unfinished += 1
+        else:
+            self.wins[winner_seat] += 1
+        self.turns += turns
+        self.passes += passes
+        self.cards_left += cards_left
+        self.max_turns = max(self.max_turns, turns)
+
+    def merge(self, other: "SimulationStats"):
+        self.games += other.games
+        self.unfinished += other.unfinished
+        for seat in range(4):
+            self.wins[seat] += other.wins[seat]
+        self.turns += other.turns
+        self.passes += other.passes
+        self.cards_left += other.cards_left
+        self.max_turns = max(self.max_turns, other.max_turns)
+
+    def summary(self) -> dict:
+        games = max(self.games, 1)
+        return {
+            "games": self.games,
+            "unfinished": self.unfinished,
+            "win_rate": [wins / games for wins in self.wins],
+            "avg_turns": self.turns / games,
+            "avg_passes": self.passes / games,
+            "avg_cards_left": self.cards_left / games,
+            "max_turns": self.max_turns,
+        }
+
+def play_chunk(args: Tuple[int, int, int, Optional[str], str]) -> SimulationStats:
+    seed, start, stop, log_dir, rules_name = args
+    rules = RULES[rules_name]
+    stats = SimulationStats()
+    if log_dir is None:
+        for index in range(start, stop):
+            stats.add(*play_game(game_rng(seed, index), rules=rules))
+        return stats
+    
+    with GameLogWriter(os.path.join(log_dir, f"games-{seed}-{start:010d}.tlg"), rules=rules) as writer:
+        for index in range(start, stop):
+            stats.add(*play_game(game_rng(seed, index), writer, rules=rules))
+    return stats
+
+def iter_chunks(games: int, seed: int = 0, workers: int = 1, chunk_size: int = 256,
+                log_dir: Optional[str] = None, rules: str = "simple") -> Iterator[SimulationStats]:
+    chunks = [(seed, start, min(start + chunk_size, games), log_dir, rules) for start in range(0, games, chunk_size)]
+
+    if workers <= 1:
+        for chunk in chunks:
+            yield play_chunk(chunk)
+        return
+
+    with Pool(workers) as pool:
+        for stats in pool.imap_unordered(play_chunk, chunks):
+            yield stats
+
+def run_simulation(games: int, seed: int = 0, workers: int = 1, chunk_size: int = 256,
+                   log_dir: Optional[str] = None, rules: str = "simple") -> SimulationStats:
+    total = SimulationStats()
+    for stats in iter_chunks(games, seed, workers, chunk_size, log_dir, rules):
+        total.merge(stats)
+    return total
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Headless AI-vs-AI Tien Len simulation")
+    parser.add_argument("-n", "--games", type=int, default=1000)
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument("--log-dir", help="write a binary game log per chunk into this directory")
+    parser.add_argument("--rules", choices=sorted(RULES), default="simple",
+                        help="simple: singles to quads and 5-card straights; full: adds longer straights, pair sequences and chops")
+    args = parser.parse_args(argv)
+    if args.log_dir:
+        os.makedirs(args.log_dir, exist_ok=True)
+
+    start_time = time.perf_counter()
+    total = SimulationStats()
+    for stats in iter_chunks(args.games, args.seed, args.workers, args.chunk_size, args.log_dir, args.rules):
+        total.merge(stats)
+        print(f"\r{total.games}/{args.games} games", end="", file=sys.stderr)
+    print(file=sys.stderr)
+    elapsed = time.perf_counter() - start_time
+
+    summary = total.summary()
+    for key, value in summary.items():
+        print(f"{key}: {value}")
+    print(f"games_per_second: {total.games / elapsed:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from batchsim import check_batch
+
+def test_batch_matches_simulate():
+    assert check_batch(200, seed=3) == []
@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+from belief import BeliefTracker, within_caps
+from engine import Game
+from movegen import NUM_VALUES
+
+def tracked_positions(games=30):
+    for seed in range(games):
+        game = Game(random.Random(seed))
+        game.tracker = BeliefTracker()
+        for player in game.players:
+            player.is_human = False
+        game.deal_cards()
+        while not game.winner:
+            yield game
+            game.ai_play(game.players[game.current_player])
+
+def check_holdings(tracker, seat, own, holdings):
+    excluded, caps = tracker.constraints(seat) or ([0] * 4, [[4] * NUM_VALUES for _ in range(4)])
+    assert holdings[seat] == own
+    dealt = 0
+    for other, holding in enumerate(holdings):
+        assert holding.bit_count() == tracker.counts[other]
+        assert not holding & excluded[other]
+        assert within_caps(holding, caps[other])
+        assert not dealt & holding
+        dealt |= holding
+    assert dealt == tracker.unseen(own) | own
+
+def test_true_hands_satisfy_constraints():
+    constrained = 0
+    for game in tracked_positions():
+        tracker = game.tracker
+        for seat in range(4):
+            constrained += tracker.constraints(seat) is not None
+            own = game.players[seat].mask
+            check_holdings(tracker, seat, own, [player.mask for player in game.players])
+    assert constrained
+
+def test_samples_respect_constraints():
+    rng = random.Random(0)
+    checked = 0
+    for turn, game in enumerate(tracked_positions(10)):
+        seat = game.current_player
+        own = game.players[seat].mask
+        if game.tracker.constraints(seat) is None or turn % 3:
+            continue
+        for _ in range(5):
+            check_holdings(game.tracker, seat, own, game.tracker.sample(seat, own, rng))
+            checked += 1
+    assert checked
+
+def test_batch_samples_respect_constraints():
+    np = pytest.importorskip("numpy")
+    rng = np.random.default_rng(0)
+    checked = 0
+    for turn, game in enumerate(tracked_positions(10)):
+        seat = game.current_player
+        own = game.players[seat].mask
+        if game.tracker.constraints(seat) is None or turn % 3:
+            continue
+        for row in game.tracker.sample_batch(seat, own, 20, rng):
+            check_holdings(game.tracker, seat, own, [int(holding) for holding in row])
+            checked += 1
+    assert checked
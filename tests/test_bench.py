@@ -0,0 +1,12 @@
+import json
+from importlib.util import find_spec
+
+import pytest
+
+import bench
+
+@pytest.mark.skipif(find_spec("pygame") is None, reason="pygame is not installed")
+def test_stdout_is_json(capsys):
+    assert bench.main(["--only", "draw_player_cards", "--repeat", "1"]) == 0
+    result = json.loads(capsys.readouterr().out)
+    assert "draw_player_cards" in result["results"]
@@ -0,0 +1,71 @@
+import random
+
+from belief import BeliefTracker
+from engine import PASS, Game
+from rules import FULL_RULES, SIMPLE_RULES
+
+class ListRecorder:
+    def __init__(self):
+        self.actions = []
+
+    def start_game(self, deal):
+        pass
+
+    def record(self, seat, mask):
+        self.actions.append((seat, mask))
+
+    def end_game(self, winner):
+        pass
+
+def new_game(seed=0, rules=None):
+    game = Game(random.Random(seed), rules)
+    game.recorder = ListRecorder()
+    game.tracker = BeliefTracker()
+    for player in game.players:
+        player.is_human = False
+    game.deal_cards()
+    return game
+
+def test_apply_and_undo_leave_observers_alone():
+    game = new_game()
+    game.ai_play(game.players[game.current_player])
+    actions = list(game.recorder.actions)
+    excluded = list(game.tracker.excluded)
+    caps = [list(caps) for caps in game.tracker.caps]
+
+    game.apply(game.legal_moves()[0])
+    game.apply(PASS)
+    game.undo()
+    game.undo()
+
+    assert game.recorder.actions == actions
+    assert game.tracker.excluded == excluded
+    assert game.tracker.caps == caps
+
+def test_undo_restores_every_position():
+    for rules in (SIMPLE_RULES, FULL_RULES):
+        for seed in range(20):
+            game = new_game(seed, rules)
+            rng = random.Random(seed)
+            states = []
+            while not game.winner and len(states) < 60:
+                states.append((game.snapshot(), [list(player.cards) for player in game.players], game.last_hand))
+                game.apply(rng.choice(game.legal_moves()))
+            while states:
+                game.undo()
+                state, hands, last_hand = states.pop()
+                assert game.snapshot() == state
+                assert [player.cards for player in game.players] == hands
+                assert (game.last_hand.mask if game.last_hand else 0) == (last_hand.mask if last_hand else 0)
+                assert game.winner is None
+
+def test_play_cards_rejects_non_combinations():
+    game = new_game(rules=FULL_RULES)
+    player = game.players[game.current_player]
+    junk = [card for card in player.cards if card.index == 0] + [player.cards[-1]]
+    before = game.snapshot()
+
+    game.play_cards(player, junk)
+
+    assert game.snapshot() == before
+    assert game.recorder.actions == []
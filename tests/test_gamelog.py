@@ -0,0 +1,20 @@
+import pytest
+
+from gamelog import GameLogReader, GameLogWriter
+from rules import FULL_RULES, SIMPLE_RULES
+from simulate import game_rng, play_game
+
+def test_log_remembers_its_rules(tmp_path):
+    path = str(tmp_path / "games.tlg")
+    with GameLogWriter(path, rules=FULL_RULES) as writer:
+        results = [play_game(game_rng(0, index), writer, rules=FULL_RULES) for index in range(20)]
+
+    with GameLogReader(path) as reader:
+        assert reader.rules is FULL_RULES
+        for n, (winner, _, _, _) in enumerate(results):
+            game = reader.replay(n)
+            assert game.rules is FULL_RULES
+            assert reader[n].winner == winner
+
+    with pytest.raises(ValueError):
+        GameLogWriter(path, rules=SIMPLE_RULES)
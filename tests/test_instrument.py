@@ -0,0 +1,18 @@
+from instrument import Histogram
+
+def test_percentiles_stay_within_max():
+    histogram = Histogram()
+    for micros in (40, 41, 42, 43, 46):
+        histogram.add(micros / 1e6)
+    assert histogram.percentile(0.5) <= histogram.max
+    assert histogram.percentile(0.95) <= histogram.max
+    assert histogram.percentile(1.0) == histogram.max
+
+def test_percentiles_are_ordered():
+    histogram = Histogram()
+    for micros in range(1, 2000, 7):
+        histogram.add(micros / 1e6)
+    p50 = histogram.percentile(0.5)
+    p95 = histogram.percentile(0.95)
+    assert 0 < p50 <= p95 <= histogram.max
+    assert 0.5e-3 < p50 < 2e-3
@@ -0,0 +1,41 @@
+import random
+from itertools import combinations
+
+import pytest
+
+from cards import legal_hand_masks, lookup_hand
+from rules import FULL_RULES, SIMPLE_RULES
+
+def random_mask(rng, size):
+    return sum(1 << index for index in rng.sample(range(52), size))
+
+def test_simple_classify_matches_table():
+    for mask in legal_hand_masks():
+        assert SIMPLE_RULES.classify(mask) == lookup_hand(mask)
+    rng = random.Random(1)
+    for _ in range(5000):
+        mask = random_mask(rng, rng.randint(1, 7))
+        assert SIMPLE_RULES.classify(mask) == lookup_hand(mask)
+
+@pytest.mark.parametrize("rules", [SIMPLE_RULES, FULL_RULES], ids=lambda rules: rules.name)
+def test_generation_matches_brute_force(rules):
+    rng = random.Random(2)
+    for _ in range(40):
+        indices = rng.sample(range(52), 10)
+        hand = sum(1 << index for index in indices)
+        legal = set()
+        for size in range(1, len(indices) + 1):
+            for combo in combinations(indices, size):
+                mask = sum(1 << index for index in combo)
+                if rules.classify(mask)[0] is not None:
+                    legal.add(mask)
+        assert set(rules.generate_from_mask(hand)) == legal
+
+        for _ in range(5):
+            last = random_mask(rng, rng.randint(1, 8))
+            last_type, last_rank = rules.classify(last)
+            if last_type is None:
+                last = rng.choice(sorted(legal))
+                last_type, last_rank = rules.classify(last)
+            responses = rules.generate_from_mask(hand, last_type, last_rank, last.bit_count())
+            assert set(responses) == {mask for mask in legal if rules.mask_can_beat(mask, last)}
@@ -0,0 +1,261 @@
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from itertools import product
+from multiprocessing import Pool
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from engine import Game, Player
+from simulate import game_rng, play_game
+
+SEATS = 4
+Z_95 = 1.96
+ELO_SCALE = 400 / math.log(10)
+MIN_VARIANCE = 1e-3
+
+class RandomPolicy:
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
+
+    def __call__(self, game: Game, player: Player):
+        moves = game.get_valid_moves(player)
+        if game.last_hand:
+            moves.append(None)
+        return self.rng.choice(moves) if moves else None
+
+def create_policy(spec: str):
+    policy = None
+    for part in spec.split("+"):
+        name, _, arg = part.partition(":")
+        if name == "lowest":
+            policy = None
+        elif name == "random":
+            policy = RandomPolicy()
+        elif name == "ismcts":
+            from ismcts import ISMCTSPolicy
+            policy = ISMCTSPolicy(time_limit=None, playouts=int(arg or 200))
+        elif name == "endgame":
+            from endgame import EndgamePolicy
+            policy = EndgamePolicy(fallback=policy, threshold=int(arg or 12))
+        else:
+            raise ValueError(f"unknown policy {part!r}")
+    return policy
+
+def reseed(policy, key: str):
+    while policy is not None:
+        if hasattr(policy, "rng"):
+            policy.rng.seed(key)
+        policy = getattr(policy, "fallback", None)
+
+def seat_lineups(policies: int) -> List[List[int]]:
+    lineups = []
+    for lineup in product(range(policies), repeat=SEATS):
+        counts = [lineup.count(index) for index in range(policies)]
+        if min(counts) and max(counts) - min(counts) <= 1:
+            lineups.append(list(lineup))
+    return lineups
+
+_policy_cache: Dict[Tuple[str, ...], List] = {}
+
+GameResult = Tuple[List[int], Optional[int], int]
+
+def play_deals(args: Tuple[Tuple[str, ...], int, int, int]) -> List[List[GameResult]]:
+    specs, seed, start, stop = args
+    policies = _policy_cache.get(specs)
+    if policies is None:
+        policies = _policy_cache[specs] = [create_policy(spec) for spec in specs]
+
+    results = []
+    for deal in range(start, stop):
+        games = []
+        for rotation, lineup in enumerate(seat_lineups(len(specs))):
+            for index, policy in enumerate(policies):
+                reseed(policy, f"{seed}:{deal}:{rotation}:{index}")
+            winner_seat, turns, _, _ = play_game(game_rng(seed, deal), policies=[policies[i] for i in lineup])
+            games.append((lineup, None if winner_seat is None else lineup[winner_seat], turns))
+        results.append(games)
+    return results
+
+def score(elo: float) -> float:
+    return 1 / (1 + 10 ** (-elo / 400))
+
+def llr(deals: int, total: float, squares: float, elo0: float, elo1: float) -> float:
+    if not deals:
+        return 0.0
+    mean = total / deals
+    variance = max(squares / deals - mean * mean, MIN_VARIANCE)
+    p0, p1 = score(elo0), score(elo1)
+    return (p1 - p0) * (2 * total - deals * (p0 + p1)) / (2 * variance)
+
+class TournamentStats:
+    def __init__(self, policies: int):
+        self.policies = policies
+        self.games = 0
+        self.unfinished = 0
+        self.turns = 0
+        self.wins = [0] * policies
+        self.seats = [0] * policies
+        self.pair_wins = [[0] * policies for _ in range(policies)]
+        self.deals = 0
+        self.pair_deals = [[0] * policies for _ in range(policies)]
+        self.pair_scores = [[0.0] * policies for _ in range(policies)]
+        self.pair_squares = [[0.0] * policies for _ in range(policies)]
+
+    def add_deal(self, games: List[GameResult]):
+        wins = [0] * self.policies
+        for lineup, winner, turns in games:
+            self.add(lineup, winner, turns)
+            if winner is not None:
+                wins[winner] += 1
+        self.deals += 1
+        for i in range(self.policies):
+            for j in range(self.policies):
+                if i != j and wins[i] + wins[j]:
+                    share = wins[i] / (wins[i] + wins[j])
+                    self.pair_deals[i][j] += 1
+                    self.pair_scores[i][j] += share
+                    self.pair_squares[i][j] += share * share
+
+    def add(self, lineup: List[int], winner: Optional[int], turns: int):
+        self.games += 1
+        self.turns += turns
+        for index in lineup:
+            self.seats[index] += 1
+        if winner is None:
+            self.unfinished += 1
+            return
+        self.wins[winner] += 1
+        for other in set(lineup):
+            if other != winner:
+                self.pair_wins[winner][other] += 1
+
+    def ratings(self, iterations: int = 200) -> List[float]:
+        n = self.policies
+        wins = [[self.pair_wins[i][j] + 0.5 for j in range(n)] for i in range(n)]
+        strength = [1.0] * n
+        for _ in range(iterations):
+            for i in range(n):
+                total = sum(wins[i][j] for j in range(n) if j != i)
+                denominator = sum((wins[i][j] + wins[j][i]) / (strength[i] + strength[j]) for j in range(n) if j != i)
+                strength[i] = total / denominator
+            anchor = strength[0]
+            strength = [s / anchor for s in strength]
+        return [400 * math.log10(s) for s in strength]
+
+    def pair_interval(self, i: int, j: int) -> Tuple[float, float]:
+        deals = self.pair_deals[i][j]
+        p = (self.pair_scores[i][j] + 0.5) / (deals + 1)
+        variance = max(self.pair_squares[i][j] / deals - (self.pair_scores[i][j] / deals) ** 2, MIN_VARIANCE) if deals else 0.25
+        elo = ELO_SCALE * math.log(p / (1 - p))
+        return elo, Z_95 * ELO_SCALE * math.sqrt(variance / (deals + 1)) / (p * (1 - p))
+
+    def pair_llr(self, i: int, j: int, elo0: float, elo1: float) -> float:
+        return llr(self.pair_deals[i][j], self.pair_scores[i][j], self.pair_squares[i][j], elo0, elo1)
+
+class StopRule:
+    def __init__(self, min_games: int = 0, sprt: Optional[Tuple[float, float]] = None, alpha: float = 0.05,
+                 beta: float = 0.05, ci_width: Optional[float] = None):
+        self.min_games = min_games
+        self.sprt = sprt
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+        self.ci_width = ci_width
+
+    def check(self, stats: TournamentStats) -> Optional[str]:
+        if stats.games < self.min_games:
+            return None
+        others = range(1, stats.policies)
+        if self.sprt is not None:
+            results = []
+            for j in others:
+                value = stats.pair_llr(j, 0, *self.sprt)
+                if self.lower < value < self.upper:
+                    return None
+                results.append("H1" if value >= self.upper else "H0")
+            return f"sprt accepted {', '.join(results)}"
+        if self.ci_width is not None:
+            if all(stats.pair_interval(j, 0)[1] <= self.ci_width for j in others):
+                return f"95% interval within {self.ci_width:g} elo"
+        return None
+
+def deal_chunks(specs: Tuple[str, ...], seed: int, deals: int, chunk_size: int) -> Iterator[Tuple]:
+    for start in range(0, deals, chunk_size):
+        yield specs, seed, start, min(start + chunk_size, deals)
+
+def run_tournament(specs: List[str], max_games: int, seed: int = 0, workers: int = 1, chunk_size: int = 8,
+                   stop_rule: Optional[StopRule] = None, progress: bool = False) -> Tuple[TournamentStats, str, float]:
+    specs = tuple(specs)
+    stats = TournamentStats(len(specs))
+    deals = -(-max_games // len(seat_lineups(len(specs))))
+    chunks = deal_chunks(specs, seed, deals, chunk_size)
+    reason = "max games reached"
+
+    start_time = time.perf_counter()
+    pool = Pool(workers) if workers > 1 else None
+    try:
+        results = pool.imap_unordered(play_deals, chunks) if pool is not None else map(play_deals, chunks)
+        for chunk in results:
+            for games in chunk:
+                stats.add_deal(games)
+            if progress:
+                print(f"\r{stats.games} games", end="", file=sys.stderr)
+            verdict = stop_rule.check(stats) if stop_rule is not None else None
+            if verdict is not None:
+                reason = verdict
+                break
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    if progress:
+        print(file=sys.stderr)
+    return stats, reason, time.perf_counter() - start_time
+
+def report(specs: List[str], stats: TournamentStats, reason: str, elapsed: float):
+    ratings = stats.ratings()
+    print(f"{'policy':28} {'seats':>8} {'wins':>8} {'win/seat':>9} {'elo':>8} {'vs ' + specs[0]:>18}")
+    for index, spec in enumerate(specs):
+        interval = ""
+        if index:
+            elo, half = stats.pair_interval(index, 0)
+            interval = f"{elo:+.0f} +/- {half:.0f}"
+        share = stats.wins[index] / stats.seats[index] if stats.seats[index] else 0.0
+        print(f"{spec:28} {stats.seats[index]:8} {stats.wins[index]:8} {share:9.3f} {ratings[index]:+8.0f} {interval:>18}")
+    print(f"games: {stats.games} in {stats.deals} deals (unfinished {stats.unfinished})")
+    print(f"stopped: {reason}")
+    print(f"games_per_second: {stats.games / elapsed:.1f}")
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Rate AI policies against each other over duplicate deals")
+    parser.add_argument("policies", nargs="+",
+                        help="policy specs such as lowest, random, ismcts:200, ismcts:200+endgame:10 (first is the reference)")
+    parser.add_argument("-n", "--max-games", type=int, default=100000)
+    parser.add_argument("--min-games", type=int, default=200)
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=8, help="deals per task (each deal is played once per seating)")
+    parser.add_argument("--sprt", help="stop when an SPRT between ELO0,ELO1 settles for every policy against the first")
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--beta", type=float, default=0.05)
+    parser.add_argument("--ci-width", type=float, help="stop when every 95%% elo interval against the first is this narrow")
+    args = parser.parse_args(argv)
+
+    if not 2 <= len(args.policies) <= SEATS:
+        parser.error(f"need between 2 and {SEATS} policies")
+    for spec in args.policies:
+        try:
+            create_policy(spec)
+        except ValueError as e:
+            parser.error(str(e))
+
+    sprt = tuple(float(x) for x in args.sprt.split(",")) if args.sprt else None
+    stop_rule = StopRule(args.min_games, sprt, args.alpha, args.beta, args.ci_width)
+    stats, reason, elapsed = run_tournament(args.policies, args.max_games, args.seed, args.workers,
+                                            args.chunk_size, stop_rule, progress=True)
+    report(args.policies, stats, reason, elapsed)
+
+if __name__ == "__main__":
+    main()